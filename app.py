@@ -5,15 +5,18 @@ from dotenv import load_dotenv
 load_dotenv()
 st.set_page_config(page_title="Invoice Pro", layout="wide", page_icon="📄")
 
-from supabase import create_client
+from utils.repository import open_backend
 
 @st.cache_resource
-def get_supabase():
+def get_db():
+    # INVOICEPRO_BACKEND=sqlite runs against an embedded database instead of Supabase
+    if os.environ.get("INVOICEPRO_BACKEND", "supabase") != "supabase":
+        return open_backend()
     url = os.environ.get("SUPABASE_URL") or st.secrets.get("SUPABASE_URL", "")
     key = os.environ.get("SUPABASE_KEY") or st.secrets.get("SUPABASE_KEY", "")
-    return create_client(url, key)
+    return open_backend("supabase", url=url, key=key)
 
-supabase = get_supabase()
+db = get_db()
 
 if "user" not in st.session_state:
     st.session_state.user = None
@@ -22,15 +25,15 @@ if "role" not in st.session_state:
 
 # Try to restore session from cookie on refresh
 from utils.auth import restore_session
-restore_session(supabase)
+restore_session(db)
 
 if not st.session_state.user:
     from views.auth_page import show_auth
-    show_auth(supabase)
+    show_auth(db)
 else:
     from utils.auth import check_access, logout
 
-    if not check_access(supabase, st.session_state.user["id"]):
+    if not check_access(db, st.session_state.user["id"]):
         st.error("⛔ Your access has been suspended or has expired. Contact the administrator.")
         if st.button("Logout"):
             logout()
@@ -59,19 +62,19 @@ else:
 
     if menu == "📄 Invoice Builder":
         from views.invoice_builder import show_invoice_builder
-        show_invoice_builder(supabase)
+        show_invoice_builder(db)
     elif menu == "🗂️ Invoices":
         from views.invoices_list import show_invoices
-        show_invoices(supabase)
+        show_invoices(db)
     elif menu == "⚙️ Settings":
         from views.settings import show_settings
-        show_settings(supabase)
+        show_settings(db)
     elif menu == "👥 User Management":
         from views.user_management import show_user_management
-        show_user_management(supabase)
+        show_user_management(db)
     elif menu == "📊 Admin Dashboard":
         from views.admin_dashboard import show_admin_dashboard
-        show_admin_dashboard(supabase)
+        show_admin_dashboard(db)
     elif menu == "🔐 Super Admin":
         from views.super_admin import show_super_admin
-        show_super_admin(supabase)
\ No newline at end of file
+        show_super_admin(db)
\ No newline at end of file
@@ -0,0 +1 @@
+# Lets pytest import the app packages (utils, views, invoicepro) from the repo root
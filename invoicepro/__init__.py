@@ -0,0 +1,4 @@
+"""Headless entry points for InvoicePro; the web app itself is app.py.
+
+Nothing in this package imports Streamlit.
+"""
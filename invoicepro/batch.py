@@ -0,0 +1,141 @@
+"""Create invoices in bulk from a spec file and render their PDFs, without the web app.
+
+    python -m invoicepro.batch SPEC --user EMAIL --out DIR
+
+SPEC is either
+  * a CSV or XLSX file in the importer's layout: one row per line item, an
+    Invoice column grouping the rows of each invoice (utils/importer), or
+  * a JSON file holding a list of invoices, or {"invoices": [...]}, each with
+    client_name, client_address, client_email, client_phone, issue_date,
+    due_date, invoice_status, optionally invoice_number, and "items": a list
+    of {column key: value}.
+
+The storage backend comes from $INVOICEPRO_BACKEND like the app's (with
+$SUPABASE_URL/$SUPABASE_KEY or $INVOICEPRO_SQLITE_PATH). Numbers are reserved
+from the user's counter a chunk at a time, PDFs are rendered by a process
+pool and written to DIR with a manifest.csv and summary.json.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from utils.batch_export import export_pdfs_dir, pdf_filename
+from utils.db import get_profile, get_profile_by_email, get_user_settings
+from utils.importer import (
+    IMPORT_CHUNK_SIZE, ImportReport, enabled_columns, invoice_fields, invoice_record,
+    parse_invoice_rows, parse_item, save_invoices,
+)
+from utils.repository import open_backend
+
+def _json_records(path: str, user_id: str, settings: dict, report: ImportReport):
+    with open(path, encoding="utf-8") as f:
+        spec = json.load(f)
+    invoices = spec.get("invoices", []) if isinstance(spec, dict) else spec
+    keys = [c["key"] for c in enabled_columns(settings)]
+    for n, inv in enumerate(invoices, start=1):
+        report.row()
+        try:
+            items = [item for item in (parse_item(raw, keys) for raw in inv.get("items") or []) if item]
+            if not items:
+                raise ValueError("no valid items")
+            yield invoice_record(user_id, settings, invoice_fields(inv), items, inv.get("invoice_number"))
+        except ValueError as e:
+            report.error(None, f"invoice {n} of the spec: {e}")
+
+def spec_records(path: str, user_id: str, settings: dict, report: ImportReport):
+    """Yield an invoices row (numbered from the spec, if at all) for each invoice in the spec file."""
+    if path.lower().endswith(".json"):
+        return _json_records(path, user_id, settings, report)
+
+    def rows():
+        with open(path, "rb") as f:
+            yield from parse_invoice_rows(f, os.path.basename(path), user_id, settings, report)
+    return rows()
+
+def run_batch(db, user_id: str, spec: str, out_dir: str, keep_numbers: bool = False,
+              workers: int = None, chunk_size: int = IMPORT_CHUNK_SIZE, render: bool = True,
+              progress=None) -> dict:
+    """Create the spec's invoices for user_id and render them into out_dir.
+
+    Invoices stream from the spec through the chunked inserts into the render
+    pool, so memory stays bounded by a chunk. progress(done, per_second) is
+    called after every PDF.
+    Returns {"invoices", "pdfs", "rows", "errors", "error_count", "seconds", "per_second"}.
+    """
+    settings = get_user_settings(db, user_id)
+    report = ImportReport()
+    os.makedirs(out_dir, exist_ok=True)
+    saved = save_invoices(db, user_id, spec_records(spec, user_id, settings, report), settings,
+                          report, keep_numbers, chunk_size)
+    count = 0
+    with open(os.path.join(out_dir, "manifest.csv"), "w", newline="", encoding="utf-8") as f:
+        manifest = csv.writer(f)
+        manifest.writerow(["invoice_number", "client_name", "issue_date", "grand_total", "pdf"])
+
+        def invoices():
+            nonlocal count
+            for record in saved:
+                inv = {**settings, **record}
+                manifest.writerow([inv["invoice_number"], inv["client_name"], inv["issue_date"],
+                                   f"{inv['grand_total']:.2f}", pdf_filename(inv) if render else ""])
+                count += 1
+                yield inv
+
+        if render:
+            pdfs = export_pdfs_dir(invoices(), out_dir, workers, progress)["count"]
+        else:
+            pdfs = 0
+            for _ in invoices():
+                pass
+    result = report.result(invoices=count, pdfs=pdfs)
+    with open(os.path.join(out_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    return result
+
+def _find_user(db, user: str) -> str:
+    try:
+        profile = get_profile_by_email(db, user) if "@" in user else get_profile(db, user, "id")
+    except:
+        profile = None
+    if not profile:
+        raise SystemExit(f"No user {user}")
+    return profile["id"]
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m invoicepro.batch",
+        description="Create invoices in bulk from a CSV, XLSX or JSON spec and render their PDFs.",
+    )
+    parser.add_argument("spec", help="CSV/XLSX (one row per line item) or JSON file of invoices")
+    parser.add_argument("--user", required=True, help="email or id of the invoices' owner")
+    parser.add_argument("--out", required=True, help="directory for the PDFs, manifest.csv and summary.json")
+    parser.add_argument("--keep-numbers", action="store_true",
+                        help="keep the spec's invoice numbers instead of taking new ones")
+    parser.add_argument("--workers", type=int, default=None, help="PDF render processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE, help="invoices per bulk insert")
+    parser.add_argument("--no-pdf", action="store_true", help="only create the invoices")
+    args = parser.parse_args(argv)
+
+    db = open_backend()
+    user_id = _find_user(db, args.user)
+
+    def report(done, per_second):
+        print(f"\r{done:,} invoices · {per_second:,.1f}/sec", end="", file=sys.stderr, flush=True)
+
+    try:
+        result = run_batch(db, user_id, args.spec, args.out, keep_numbers=args.keep_numbers,
+                           workers=args.workers, chunk_size=args.chunk_size, render=not args.no_pdf,
+                           progress=report if sys.stderr.isatty() else None)
+    except ValueError as e:
+        print(f"\n{e}", file=sys.stderr)
+        return 1
+    print(file=sys.stderr)
+    for line, message in result["errors"]:
+        print(f"skipped line {line}: {message}" if line else f"skipped {message}", file=sys.stderr)
+    print(f"Created {result['invoices']:,} invoices and {result['pdfs']:,} PDFs in {result['seconds']:.1f}s "
+          f"({result['error_count']:,} skipped) -> {args.out}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
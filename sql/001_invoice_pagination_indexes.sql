@@ -0,0 +1,11 @@
+-- Indexes backing utils/db.get_invoices_page (keyset pagination on created_at, id).
+-- Run once in the Supabase SQL editor.
+
+create index if not exists invoices_user_created_idx
+    on invoices (user_id, created_at desc, id desc);
+
+create index if not exists invoices_created_idx
+    on invoices (created_at desc, id desc);
+
+create index if not exists invoices_status_created_idx
+    on invoices (invoice_status, created_at desc, id desc);
@@ -0,0 +1,15 @@
+-- Per-status invoice counts and revenue for the Admin Dashboard
+-- (utils/db.get_invoice_totals). The covering index lets Postgres answer the
+-- aggregate from an index-only scan instead of reading whole invoice rows.
+
+create index if not exists invoices_status_total_idx
+    on invoices (invoice_status) include (grand_total);
+
+create or replace view invoice_status_totals
+with (security_invoker = true) as
+select
+    invoice_status,
+    count(*)::bigint              as invoice_count,
+    coalesce(sum(grand_total), 0) as revenue
+from invoices
+group by invoice_status;
@@ -0,0 +1,140 @@
+-- Rollup of platform statistics for the Super Admin Stats tab
+-- (utils/db.get_platform_stats). Triggers keep the counters current on invoice
+-- save, profile creation (user approval) and signup; reconcile_platform_stats()
+-- recomputes exact counts and is called periodically by the app. It can also
+-- be scheduled with pg_cron:
+--   select cron.schedule('reconcile-stats', '0 * * * *', 'select reconcile_platform_stats()');
+--
+-- platform_stats holds the counts as of the last reconcile; the triggers add
+-- their deltas to one of 16 platform_stats_shards rows, picked by backend pid,
+-- instead of all updating one row. A single counter row would make every
+-- invoice insert on the platform queue on its lock; with shards, concurrent
+-- saves from different connections rarely touch the same row. Readers sum
+-- the shards through platform_stats_totals.
+
+create table if not exists platform_stats (
+    id               smallint primary key default 1 check (id = 1),
+    total_users      bigint not null default 0,
+    total_invoices   bigint not null default 0,
+    pending_requests bigint not null default 0,
+    reconciled_at    timestamptz not null default now()
+);
+
+create table if not exists platform_stats_shards (
+    shard            smallint primary key check (shard between 0 and 15),
+    total_users      bigint not null default 0,
+    total_invoices   bigint not null default 0,
+    pending_requests bigint not null default 0
+);
+insert into platform_stats_shards (shard) select generate_series(0, 15) on conflict do nothing;
+
+-- Only Super Admins may read the counts, and nobody writes them directly: the
+-- triggers and reconcile_platform_stats run as the owner.
+alter table platform_stats enable row level security;
+alter table platform_stats_shards enable row level security;
+
+drop policy if exists platform_stats_superadmin on platform_stats;
+create policy platform_stats_superadmin on platform_stats for select
+    using (exists (select 1 from profiles p where p.id = auth.uid() and p.role = 'superadmin'));
+drop policy if exists platform_stats_shards_superadmin on platform_stats_shards;
+create policy platform_stats_shards_superadmin on platform_stats_shards for select
+    using (exists (select 1 from profiles p where p.id = auth.uid() and p.role = 'superadmin'));
+
+create or replace view platform_stats_totals with (security_invoker = true) as
+select p.total_users + s.total_users           as total_users,
+       p.total_invoices + s.total_invoices     as total_invoices,
+       p.pending_requests + s.pending_requests as pending_requests,
+       p.reconciled_at
+  from platform_stats p,
+       (select sum(total_users) as total_users, sum(total_invoices) as total_invoices,
+               sum(pending_requests) as pending_requests
+          from platform_stats_shards) s
+ where p.id = 1;
+
+create or replace function reconcile_platform_stats()
+returns platform_stats_totals
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_totals platform_stats_totals;
+begin
+    -- Zeroing the shards first waits for in-flight trigger updates to commit,
+    -- so the counts below include exactly the deltas dropped here
+    update platform_stats_shards
+       set total_users = 0, total_invoices = 0, pending_requests = 0;
+
+    insert into platform_stats (id, total_users, total_invoices, pending_requests, reconciled_at)
+    values (
+        1,
+        (select count(*) from profiles),
+        (select count(*) from invoices),
+        (select count(*) from signup_requests where status = 'pending'),
+        now()
+    )
+    on conflict (id) do update set
+        total_users      = excluded.total_users,
+        total_invoices   = excluded.total_invoices,
+        pending_requests = excluded.pending_requests,
+        reconciled_at    = excluded.reconciled_at;
+
+    select * into v_totals from platform_stats_totals;
+    return v_totals;
+end;
+$$;
+
+-- Security definer, so only the app's server key may run it
+revoke execute on function reconcile_platform_stats() from public, anon, authenticated;
+
+create or replace function bump_platform_stats()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    d_users    int := 0;
+    d_invoices int := 0;
+    d_pending  int := 0;
+begin
+    if tg_table_name = 'profiles' then
+        d_users := case tg_op when 'INSERT' then 1 when 'DELETE' then -1 else 0 end;
+    elsif tg_table_name = 'invoices' then
+        d_invoices := case tg_op when 'INSERT' then 1 when 'DELETE' then -1 else 0 end;
+    elsif tg_table_name = 'signup_requests' then
+        if tg_op in ('UPDATE', 'DELETE') and old.status = 'pending' then
+            d_pending := d_pending - 1;
+        end if;
+        if tg_op in ('INSERT', 'UPDATE') and new.status = 'pending' then
+            d_pending := d_pending + 1;
+        end if;
+    end if;
+
+    if d_users <> 0 or d_invoices <> 0 or d_pending <> 0 then
+        update platform_stats_shards set
+            total_users      = total_users + d_users,
+            total_invoices   = total_invoices + d_invoices,
+            pending_requests = pending_requests + d_pending
+        where shard = pg_backend_pid() % 16;
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists platform_stats_profiles on profiles;
+create trigger platform_stats_profiles
+    after insert or delete on profiles
+    for each row execute function bump_platform_stats();
+
+drop trigger if exists platform_stats_invoices on invoices;
+create trigger platform_stats_invoices
+    after insert or delete on invoices
+    for each row execute function bump_platform_stats();
+
+drop trigger if exists platform_stats_signup_requests on signup_requests;
+create trigger platform_stats_signup_requests
+    after insert or update of status or delete on signup_requests
+    for each row execute function bump_platform_stats();
+
+select reconcile_platform_stats();
@@ -0,0 +1,54 @@
+-- Content-addressed logo store (utils/assets.py). Each uploaded image is keyed
+-- by the SHA-256 of its bytes and stored once per pre-sized variant, however
+-- many users upload it; user_settings refers to it by hash.
+
+create table if not exists logo_assets (
+    hash        text not null,
+    variant     text not null,
+    mime        text not null,
+    width       integer not null,
+    height      integer not null,
+    data_base64 text not null,
+    created_at  timestamptz not null default now(),
+    primary key (hash, variant)
+);
+
+alter table user_settings add column if not exists logo_hash text;
+
+-- Computed column: true while a row still carries an inline base64 logo that
+-- utils/db.get_user_settings should migrate into logo_assets
+create or replace function legacy_logo_pending(user_settings)
+returns boolean
+language sql
+stable
+as $$
+    select $1.company_logo_base64 is not null and $1.logo_hash is null;
+$$;
+
+-- Assets are shared by every tenant that uploads the same image, so clients
+-- may read them but never write them directly: a row planted under the hash
+-- of someone else's logo would be served to all of them. Writes go through
+-- store_logo_asset, which keys the variants by the SHA-256 of the original
+-- upload computed here rather than by a hash the client supplies.
+alter table logo_assets enable row level security;
+
+drop policy if exists logo_assets_read on logo_assets;
+create policy logo_assets_read on logo_assets for select using (true);
+
+create or replace function store_logo_asset(p_original text, p_variants jsonb)
+returns text
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_hash text := encode(sha256(decode(p_original, 'base64')), 'hex');
+begin
+    insert into logo_assets (hash, variant, mime, width, height, data_base64)
+    select v_hash, v.variant, v.mime, v.width, v.height, v.data_base64
+      from jsonb_to_recordset(p_variants)
+        as v (variant text, mime text, width integer, height integer, data_base64 text)
+    on conflict (hash, variant) do nothing;
+    return v_hash;
+end;
+$$;
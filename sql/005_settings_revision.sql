@@ -0,0 +1,22 @@
+-- Revision counter for user_settings. utils/db caches settings process-wide
+-- and revalidates an entry by comparing this single column, so every update
+-- (settings save, invoice counter advance) bumps it here.
+
+alter table user_settings add column if not exists revision bigint not null default 0;
+alter table user_settings add column if not exists updated_at timestamptz not null default now();
+
+create or replace function bump_settings_revision()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.revision := old.revision + 1;
+    new.updated_at := now();
+    return new;
+end;
+$$;
+
+drop trigger if exists user_settings_revision on user_settings;
+create trigger user_settings_revision
+    before update on user_settings
+    for each row execute function bump_settings_revision();
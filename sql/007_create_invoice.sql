@@ -0,0 +1,62 @@
+-- One-round-trip invoice save (utils/db.save_invoice_with_counter). Inserts the
+-- invoice and advances the owner's invoice counter in the same transaction, so
+-- a failure anywhere leaves neither behind. The invoice number is formatted
+-- here from the settings row exactly like utils/db.format_invoice_number.
+--
+-- p_counter is a number already reserved through allocate_invoice_numbers
+-- (sql/006, block allocation); when null the next counter value is taken here.
+-- Runs as the caller, so row level security on invoices and user_settings
+-- still applies: the user_id in p_invoice can't be someone else's.
+
+create or replace function create_invoice(p_invoice jsonb, p_counter bigint default null)
+returns table (invoice_id uuid, invoice_number text, settings_revision bigint)
+language plpgsql
+security invoker
+set search_path = public
+as $$
+declare
+    v_user_id  uuid := (p_invoice ->> 'user_id')::uuid;
+    v_counter  bigint := p_counter;
+    v_prefix   text;
+    v_revision bigint;
+    v_number   text;
+    v_id       uuid;
+begin
+    if v_counter is null then
+        update user_settings s
+           set invoice_counter = s.invoice_counter + 1
+         where s.user_id = v_user_id
+     returning s.invoice_counter - 1, s.invoice_prefix, s.revision
+          into v_counter, v_prefix, v_revision;
+    else
+        select s.invoice_prefix, s.revision
+          into v_prefix, v_revision
+          from user_settings s
+         where s.user_id = v_user_id;
+    end if;
+
+    if not found then
+        raise exception 'No settings row for user %', v_user_id;
+    end if;
+
+    v_number := coalesce(v_prefix, '') || case
+        when length(v_counter::text) < 4 then lpad(v_counter::text, 4, '0')
+        else v_counter::text
+    end;
+
+    insert into invoices (
+        user_id, invoice_number, client_name, client_address, client_email, client_phone,
+        issue_date, due_date, items, subtotal, cgst_amount, sgst_amount, grand_total,
+        gst_enabled, cgst_percent, sgst_percent, terms_conditions, template, invoice_status
+    )
+    select
+        r.user_id, v_number, r.client_name, r.client_address, r.client_email, r.client_phone,
+        r.issue_date, r.due_date, r.items, r.subtotal, r.cgst_amount, r.sgst_amount, r.grand_total,
+        r.gst_enabled, r.cgst_percent, r.sgst_percent, r.terms_conditions, r.template,
+        coalesce(r.invoice_status, 'draft')
+      from jsonb_populate_record(null::invoices, p_invoice) r
+    returning id into v_id;
+
+    return query select v_id, v_number, v_revision;
+end;
+$$;
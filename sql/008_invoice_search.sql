@@ -0,0 +1,63 @@
+-- Indexed, ranked invoice search (utils/db.search_invoices).
+--
+-- Trigram indexes serve substring and fuzzy matches on the three searched
+-- columns; they also back the ilike filter in get_invoices_page. A weighted
+-- tsvector serves word-prefix matching: "acm ind" finds "Acme Industries".
+
+create extension if not exists pg_trgm;
+
+create index if not exists invoices_client_name_trgm_idx
+    on invoices using gin (client_name gin_trgm_ops);
+create index if not exists invoices_number_trgm_idx
+    on invoices using gin (invoice_number gin_trgm_ops);
+create index if not exists invoices_client_email_trgm_idx
+    on invoices using gin (client_email gin_trgm_ops);
+
+alter table invoices add column if not exists search_vector tsvector
+    generated always as (
+        setweight(to_tsvector('simple', coalesce(invoice_number, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(client_name, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(client_email, '')), 'C')
+    ) stored;
+
+create index if not exists invoices_search_vector_idx
+    on invoices using gin (search_vector);
+
+-- Every word of p_query is matched as a prefix; rows that only match by
+-- substring or trigram similarity rank below the full-text hits. Returns whole
+-- invoices rows, best match first, so callers pick columns with PostgREST's
+-- select; p_offset skips that many for the following pages. Runs as the
+-- caller, so row level security still applies.
+create or replace function search_invoices(
+    p_query   text,
+    p_user_id uuid default null,
+    p_status  text default null,
+    p_limit   int  default 50,
+    p_offset  int  default 0
+)
+returns setof invoices
+language sql
+stable
+as $$
+    with q as (
+        select
+            trim(p_query) as raw,
+            (select to_tsquery('simple', string_agg(quote_literal(w) || ':*', ' & '))
+               from unnest(regexp_split_to_array(lower(trim(p_query)), '[^[:alnum:]]+')) w
+              where w <> '') as ts
+    )
+    select i.*
+      from invoices i, q
+     where (p_user_id is null or i.user_id = p_user_id)
+       and (p_status is null or i.invoice_status = p_status)
+       and (i.search_vector @@ q.ts
+            or i.client_name ilike '%' || q.raw || '%'
+            or i.invoice_number ilike '%' || q.raw || '%'
+            or i.client_email ilike '%' || q.raw || '%'
+            or i.client_name % q.raw)
+     order by coalesce(ts_rank(i.search_vector, q.ts), 0) * 2
+              + greatest(similarity(i.client_name, q.raw), similarity(i.invoice_number, q.raw),
+                         similarity(coalesce(i.client_email, ''), q.raw)) desc,
+              i.created_at desc, i.id desc
+     limit p_limit offset p_offset;
+$$;
@@ -0,0 +1,54 @@
+-- Native line items (utils/db.find_invoices_by_serial, revenue_by_description).
+--
+-- The app used to save items as json.dumps(...) output, so each row held one
+-- opaque JSON string instead of an array the database could look into. Make
+-- the column jsonb, unwrap the string-encoded rows into real arrays and index
+-- them for containment queries such as items @> '[{"serial_no": "X"}]'.
+
+do $$
+begin
+    if (select data_type from information_schema.columns
+         where table_schema = 'public' and table_name = 'invoices' and column_name = 'items') <> 'jsonb' then
+        alter table invoices alter column items type jsonb
+            using case when coalesce(items::text, '') = '' then '[]'::jsonb else items::text::jsonb end;
+    end if;
+end;
+$$;
+
+update invoices
+   set items = (items #>> '{}')::jsonb
+ where jsonb_typeof(items) = 'string';
+
+create index if not exists invoices_items_gin_idx
+    on invoices using gin (items jsonb_path_ops);
+
+-- Quantity and revenue per item description, highest revenue first, without
+-- shipping any invoice to the client. Runs as the caller, so row level
+-- security still applies.
+create or replace function revenue_by_description(
+    p_user_id uuid default null,
+    p_status  text default null,
+    p_from    date default null,
+    p_to      date default null,
+    p_limit   int  default 50
+)
+returns table (description text, invoice_count bigint, quantity numeric, revenue numeric)
+language sql
+stable
+as $$
+    select it.description,
+           count(distinct i.id),
+           sum(it.quantity),
+           sum(it.quantity * it.unit_price)
+      from invoices i
+     cross join lateral jsonb_to_recordset(
+               case when jsonb_typeof(i.items) = 'array' then i.items else '[]'::jsonb end
+           ) as it(description text, quantity numeric, unit_price numeric)
+     where (p_user_id is null or i.user_id = p_user_id)
+       and (p_status is null or i.invoice_status = p_status)
+       and (p_from is null or i.issue_date >= p_from)
+       and (p_to is null or i.issue_date <= p_to)
+     group by it.description
+     order by 4 desc nulls last
+     limit p_limit;
+$$;
@@ -0,0 +1,34 @@
+-- Item revenue from the stored line amounts (utils/pricing).
+--
+-- revenue_by_description (sql/009) summed quantity * unit_price, which need
+-- not match the rounded per-line amounts the invoice totals are made of. Sum
+-- each item's "amount" instead; items saved before amounts were stored fall
+-- back to quantity * unit_price rounded to the paisa, as they are priced on
+-- read. Runs as the caller, so row level security still applies.
+create or replace function revenue_by_description(
+    p_user_id uuid default null,
+    p_status  text default null,
+    p_from    date default null,
+    p_to      date default null,
+    p_limit   int  default 50
+)
+returns table (description text, invoice_count bigint, quantity numeric, revenue numeric)
+language sql
+stable
+as $$
+    select it.description,
+           count(distinct i.id),
+           sum(it.quantity),
+           sum(coalesce(it.amount, round(it.quantity * it.unit_price, 2)))
+      from invoices i
+     cross join lateral jsonb_to_recordset(
+               case when jsonb_typeof(i.items) = 'array' then i.items else '[]'::jsonb end
+           ) as it(description text, quantity numeric, unit_price numeric, amount numeric)
+     where (p_user_id is null or i.user_id = p_user_id)
+       and (p_status is null or i.invoice_status = p_status)
+       and (p_from is null or i.issue_date >= p_from)
+       and (p_to is null or i.issue_date <= p_to)
+     group by it.description
+     order by 4 desc nulls last
+     limit p_limit;
+$$;
@@ -0,0 +1,37 @@
+-- Bulk insert for imports that keep the file's own invoice numbers
+-- (utils/importer.save_invoices with keep_numbers). Inserts the rows and raises
+-- the owner's invoice counter past the highest kept number in one transaction,
+-- so the builder never hands out a number the import already used. Plain
+-- imports still insert through PostgREST and reserve numbers with
+-- allocate_invoice_numbers (sql/006).
+--
+-- All rows belong to one owner. Runs as the caller, so row level security on
+-- invoices and user_settings still applies.
+
+create or replace function insert_invoices(p_rows jsonb, p_min_counter bigint default null)
+returns void
+language plpgsql
+security invoker
+set search_path = public
+as $$
+begin
+    insert into invoices (
+        user_id, invoice_number, client_name, client_address, client_email, client_phone,
+        issue_date, due_date, items, subtotal, cgst_amount, sgst_amount, grand_total,
+        gst_enabled, cgst_percent, sgst_percent, terms_conditions, template, invoice_status
+    )
+    select
+        r.user_id, r.invoice_number, r.client_name, r.client_address, r.client_email, r.client_phone,
+        r.issue_date, r.due_date, r.items, r.subtotal, r.cgst_amount, r.sgst_amount, r.grand_total,
+        r.gst_enabled, r.cgst_percent, r.sgst_percent, r.terms_conditions, r.template,
+        coalesce(r.invoice_status, 'draft')
+      from jsonb_populate_recordset(null::invoices, p_rows) r;
+
+    if p_min_counter is not null then
+        update user_settings s
+           set invoice_counter = p_min_counter
+         where s.user_id = (p_rows -> 0 ->> 'user_id')::uuid
+           and s.invoice_counter < p_min_counter;
+    end if;
+end;
+$$;
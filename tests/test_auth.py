@@ -0,0 +1,38 @@
+"""Session token signing and the access cache (utils/auth)."""
+import logging
+import pytest
+from utils import auth
+from utils.sqlite_repository import SQLiteRepository
+
+@pytest.fixture(autouse=True)
+def no_secret(monkeypatch):
+    monkeypatch.delenv("SESSION_SECRET", raising=False)
+    monkeypatch.setattr(auth, "_session_secret", None)
+
+def test_missing_secret_refuses_on_supabase(monkeypatch):
+    monkeypatch.setenv("INVOICEPRO_BACKEND", "supabase")
+    with pytest.raises(RuntimeError, match="SESSION_SECRET"):
+        auth.issue_session_token({"id": "u1"})
+
+def test_missing_secret_warns_on_sqlite(monkeypatch, caplog):
+    monkeypatch.setenv("INVOICEPRO_BACKEND", "sqlite")
+    with caplog.at_level(logging.WARNING, logger="utils.auth"):
+        token = auth.issue_session_token({"id": "u1", "status": "approved"})
+    assert "SESSION_SECRET is not set" in caplog.text
+    assert auth.read_session_token(token)["id"] == "u1"
+
+def test_refusals_are_not_cached(tmp_path):
+    db = SQLiteRepository(str(tmp_path / "auth.db"))
+    user_id = db.create_profile({"email": "a@x", "status": "pending"})["id"]
+    assert not auth.check_access(db, user_id)
+    db.update_profile(user_id, {"status": "approved"})
+    assert auth.check_access(db, user_id)
+
+def test_access_cache_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(auth, "ACCESS_CACHE_SIZE", 2)
+    monkeypatch.setattr(auth, "_access_cache", auth.OrderedDict())
+    db = SQLiteRepository(str(tmp_path / "auth.db"))
+    ids = [db.create_profile({"email": f"{n}@x", "status": "approved"})["id"] for n in range(3)]
+    for user_id in ids:
+        assert auth.check_access(db, user_id)
+    assert list(auth._access_cache) == ids[1:]
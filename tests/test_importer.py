@@ -0,0 +1,105 @@
+"""Invoice imports (utils/importer) against a real SQLite database."""
+import io
+import pytest
+from utils.db import DEFAULT_SETTINGS, get_user_settings, save_invoice_with_counter
+from utils.importer import ImportReport, import_invoices, parse_invoice_rows
+from utils.sqlite_repository import SQLiteRepository
+
+@pytest.fixture
+def db(tmp_path):
+    return SQLiteRepository(str(tmp_path / "import.db"))
+
+@pytest.fixture
+def user_id(db):
+    user_id = db.create_profile({"email": "a@x", "status": "approved"})["id"]
+    db.insert_settings({"user_id": user_id, "invoice_prefix": "INV-"})
+    return user_id
+
+def _csv(*lines) -> io.BytesIO:
+    return io.BytesIO(("\n".join(lines) + "\n").encode())
+
+def _import(db, user_id, *lines, **kwargs) -> dict:
+    settings = get_user_settings(db, user_id)
+    return import_invoices(db, user_id, _csv(*lines), "history.csv", settings, **kwargs)
+
+def _saved(db, user_id) -> dict:
+    rows = db._all("select * from invoices where user_id = ? order by invoice_number", (user_id,))
+    return {r["invoice_number"]: r for r in rows}
+
+def test_kept_numbers_move_the_counter_past_them(db, user_id):
+    result = _import(
+        db, user_id,
+        "Invoice,Client,Description,Qty,Rate",
+        "INV-0003,Acme,Widget,1,10",
+        "INV-0004,Beta,Gadget,2,5",
+        "OLD-0900,Gamma,Gizmo,1,1",
+        keep_numbers=True,
+    )
+    assert result["invoices"] == 3 and result["error_count"] == 0
+    # OLD-0900 can never collide with an INV- number, so it doesn't count
+    assert get_user_settings(db, user_id)["invoice_counter"] == 5
+
+    saved = save_invoice_with_counter(db, {"user_id": user_id, "client_name": "New", "items": []})
+    assert saved["invoice_number"] == "INV-0005"
+    assert set(_saved(db, user_id)) == {"INV-0003", "INV-0004", "INV-0005", "OLD-0900"}
+
+def test_kept_numbers_never_move_the_counter_back(db, user_id):
+    db.update_settings(user_id, {"invoice_counter": 50})
+    _import(db, user_id, "Invoice,Client,Description,Qty,Rate", "INV-0007,Acme,Widget,1,10", keep_numbers=True)
+    assert get_user_settings(db, user_id)["invoice_counter"] == 50
+
+def test_clashing_kept_number_is_skipped_and_the_rest_still_move_the_counter(db, user_id):
+    _import(db, user_id, "Invoice,Client,Description,Qty,Rate", "INV-0002,Acme,Widget,1,10", keep_numbers=True)
+    result = _import(
+        db, user_id,
+        "Invoice,Client,Description,Qty,Rate",
+        "INV-0002,Acme,Widget,1,10",
+        "INV-0008,Beta,Gadget,1,10",
+        keep_numbers=True,
+    )
+    assert result["invoices"] == 1
+    assert result["errors"] == [(None, "invoice INV-0002 already exists")]
+    assert get_user_settings(db, user_id)["invoice_counter"] == 9
+
+def _parse(*lines):
+    report = ImportReport()
+    records = list(parse_invoice_rows(_csv(*lines), "history.csv", "u1", DEFAULT_SETTINGS, report))
+    return {r["invoice_number"]: r for r in records}, report
+
+def test_bad_item_on_first_row_keeps_the_invoice_header():
+    records, report = _parse(
+        "Invoice,Client,Address,Date,Status,Description,Qty,Rate",
+        "A1,Alpha,1 Road,01/02/2026,sent,Widget,1,10",
+        "B1,Beta,2 Lane,03/02/2026,paid,Gadget,1,1e400",
+        "B1,,,,,Gizmo,2,5",
+    )
+    beta = records["B1"]
+    assert (beta["client_name"], beta["client_address"]) == ("Beta", "2 Lane")
+    assert (beta["issue_date"], beta["due_date"], beta["invoice_status"]) == ("2026-02-03", "2026-02-03", "paid")
+    assert [i["description"] for i in beta["items"]] == ["Gizmo"]
+    assert beta["grand_total"] == 10.0
+    assert report.errors == [(3, "unit_price is not a number: '1e400'")]
+    assert records["A1"]["client_name"] == "Alpha"
+
+def test_bad_header_on_first_row_skips_the_whole_invoice():
+    records, report = _parse(
+        "Invoice,Client,Date,Status,Description,Qty,Rate",
+        "A1,Alpha,31/02/2026,draft,Widget,1,10",
+        "A1,,,,Gadget,1,1e400",
+        "A1,,,,Gizmo,2,5",
+        "B1,Beta,,refunded,Widget,1,10",
+        "B1,,,,Gizmo,2,5",
+        "C1,Gamma,,,Widget,1,10",
+    )
+    assert list(records) == ["C1"]
+    # One error per skipped invoice; its other rows aren't reported separately
+    assert report.errors == [(2, "unrecognised date '31/02/2026'"), (5, "unknown status 'refunded'")]
+
+def test_header_cells_after_the_first_row_are_ignored():
+    records, report = _parse(
+        "Invoice,Client,Status,Description,Qty,Rate",
+        "A1,Alpha,sent,Widget,1,10",
+        "A1,Other,bogus,Gizmo,2,5",
+    )
+    assert records["A1"]["client_name"] == "Alpha" and records["A1"]["invoice_status"] == "sent"
+    assert len(records["A1"]["items"]) == 2 and report.errors == []
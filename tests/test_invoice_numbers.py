@@ -0,0 +1,108 @@
+"""Concurrent invoice numbering (utils/numbering) against a real SQLite database.
+
+Several InvoiceNumberAllocator instances stand in for separate server
+processes sharing one database; threads save invoices through each of them
+at once, with some saves failing and their numbers released.
+"""
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from utils.db import save_invoice_with_counter
+from utils.numbering import InvoiceNumberAllocator
+from utils.repository import DuplicateError
+from utils.sqlite_repository import SQLiteRepository
+
+THREADS_PER_ALLOCATOR = 6
+SAVES_PER_THREAD = 15
+FAILED_SAVE_RATE = 0.1
+
+@pytest.fixture
+def db(tmp_path):
+    return SQLiteRepository(str(tmp_path / "numbers.db"))
+
+def _user(db, email: str, prefix: str) -> str:
+    user_id = db.create_profile({"email": email, "status": "approved"})["id"]
+    db.insert_settings({"user_id": user_id, "invoice_prefix": prefix})
+    return user_id
+
+def _record(user_id: str, n: int) -> dict:
+    return {"user_id": user_id, "client_name": f"Client {n}", "items": [], "grand_total": 0.0}
+
+@pytest.mark.parametrize("policy", ["reuse", "gaps"])
+def test_concurrent_saves_never_duplicate_a_number(db, policy):
+    users = [_user(db, "a@x", "A-"), _user(db, "b@x", "B-")]
+    # Block size 1 exercises create_invoice taking the number itself
+    allocators = [InvoiceNumberAllocator(block_size=size, policy=policy) for size in (1, 5, 20)]
+    saved, errors = [], []
+    lock = threading.Lock()
+
+    def worker(allocator, seed):
+        rng = random.Random(seed)
+        for n in range(SAVES_PER_THREAD):
+            user_id = rng.choice(users)
+            counter = allocator.take(db, user_id)
+            if counter is not None and rng.random() < FAILED_SAVE_RATE:
+                # The save failed before reaching the database
+                allocator.release(user_id, counter)
+                continue
+            try:
+                result = save_invoice_with_counter(db, _record(user_id, n), counter)
+            except Exception as e:
+                with lock:
+                    errors.append(e)
+                continue
+            with lock:
+                saved.append((user_id, result["invoice_number"]))
+
+    with ThreadPoolExecutor(max_workers=len(allocators) * THREADS_PER_ALLOCATOR) as pool:
+        futures = [pool.submit(worker, allocator, i * 100 + t)
+                   for i, allocator in enumerate(allocators) for t in range(THREADS_PER_ALLOCATOR)]
+        for f in futures:
+            f.result()
+
+    assert errors == []
+    assert len(saved) == len(set(saved))
+    stored = db._all("select user_id, invoice_number from invoices")
+    assert len(stored) == len(saved)
+    assert {(r["user_id"], r["invoice_number"]) for r in stored} == set(saved)
+    # Numbers carry their owner's prefix and stay below the counter
+    for user_id, prefix in zip(users, ("A-", "B-")):
+        counter = db.get_settings(user_id, "invoice_counter")["invoice_counter"]
+        numbers = [int(number[len(prefix):]) for uid, number in saved if uid == user_id]
+        assert all(number.startswith(prefix) for uid, number in saved if uid == user_id)
+        assert max(numbers) < counter
+
+def test_slow_allocation_only_blocks_its_own_user():
+    release = threading.Event()
+    entered = threading.Event()
+
+    class SlowForA:
+        def allocate_invoice_numbers(self, user_id, count=1):
+            if user_id == "a":
+                entered.set()
+                release.wait(5)
+            return 1
+
+    allocator = InvoiceNumberAllocator(block_size=10)
+    slow = threading.Thread(target=allocator.allocate, args=(SlowForA(), "a"))
+    slow.start()
+    assert entered.wait(5)
+    try:
+        done = threading.Event()
+        threading.Thread(target=lambda: (allocator.allocate(SlowForA(), "b"), done.set())).start()
+        assert done.wait(1), "user b waited on user a's allocation"
+        assert allocator.peek("b") == 2
+    finally:
+        release.set()
+        slow.join()
+    assert allocator.peek("a") == 2
+
+def test_reused_number_raises_duplicate_error_and_changes_nothing(db):
+    user_id = _user(db, "dup@x", "D-")
+    save_invoice_with_counter(db, _record(user_id, 1), counter=7)
+    revision = db.get_settings_revision(user_id)
+    with pytest.raises(DuplicateError):
+        save_invoice_with_counter(db, _record(user_id, 2), counter=7)
+    assert len(db._all("select id from invoices where user_id = ?", (user_id,))) == 1
+    assert db.get_settings_revision(user_id) == revision
@@ -0,0 +1,40 @@
+"""The paged item table of utils/pdf_generator."""
+import re
+import pytest
+from reportlab.lib.units import mm
+from reportlab.platypus import Paragraph, Table
+from utils import pdf_generator as pg
+from utils.db import DEFAULT_COLUMNS, DEFAULT_SETTINGS
+
+WIDTHS = [10*mm, 45*mm, 25*mm, 25*mm, 25*mm, 25*mm]
+
+def _description(i: int) -> str:
+    return "Part & labour <b>not bold</b> " * (1 + i % 5) + ("\nsecond line" if i % 7 == 0 else "")
+
+@pytest.mark.parametrize("value", ["AT&T <b>x</b>", "AT&T <b>x</b> " * 10, "two\nlines"])
+def test_cells_show_their_text_literally(value):
+    cell = pg._item_cell(value, WIDTHS[1])
+    if isinstance(cell, Paragraph):
+        assert cell.getPlainText() == value.replace("\n", "").strip()
+    else:
+        assert cell == value
+
+def test_row_heights_match_the_full_table():
+    rows = [[str(i), pg._item_cell(_description(i), WIDTHS[1]), "SN", "1.00", "₹1.00", "₹1.00"] for i in range(40)]
+    full = Table(rows, colWidths=WIDTHS)
+    full.setStyle(pg._measure_style)
+    full.wrap(500, 800)
+    assert [pg._row_height(r, WIDTHS, 500) for r in rows] == pytest.approx(full._rowHeights)
+
+def test_each_chunk_fills_exactly_one_page(monkeypatch):
+    chunks = []
+    page_chunks = pg._page_chunks
+    monkeypatch.setattr(pg, "_page_chunks", lambda *args: chunks.extend(page_chunks(*args)) or chunks)
+    items = [{"description": _description(i), "serial_no": f"SN{i}", "quantity": 1, "unit_price": 2.5}
+             for i in range(300)]
+    pdf = pg.generate_pdf({**DEFAULT_SETTINGS, "custom_columns": DEFAULT_COLUMNS, "invoice_number": "INV-0001",
+                           "client_name": "Acme", "client_address": "", "items": items})
+    # A chunk that overflowed would be split by ReportLab onto an extra page
+    assert len(chunks) > 5
+    assert len(re.findall(rb"/Type /Page\b", pdf)) == len(chunks)
+    assert [start for start, _ in chunks] == [sum(len(c) for _, c in chunks[:i]) for i in range(len(chunks))]
@@ -0,0 +1,107 @@
+"""Property checks for utils/pricing against plain Decimal arithmetic.
+
+Invoices are generated from a fixed seed per case, so a failure is
+reproducible from the test id.
+"""
+import random
+import time
+from decimal import Decimal, ROUND_HALF_UP
+import pytest
+from utils.pricing import item_amount, line_amount, price_invoice, tax
+
+CASES = 200
+GST_RATES = [(0, 0), (9, 9), (2.5, 2.5), (6, 6), (14, 14), (1.125, 3.875)]
+PAISA = Decimal("0.01")
+
+def _dec(value) -> Decimal:
+    return Decimal(str(value))
+
+def _half_up(value: Decimal) -> Decimal:
+    return value.quantize(PAISA, ROUND_HALF_UP)
+
+def _random_item(rng: random.Random) -> dict:
+    quantity = round(rng.uniform(0, 1000), rng.choice([0, 1, 2, 3]))
+    unit_price = round(rng.uniform(0, 250000), rng.choice([0, 2]))
+    return {"description": "x", "quantity": quantity, "unit_price": unit_price}
+
+def _random_invoice(seed: int):
+    rng = random.Random(seed)
+    items = [_random_item(rng) for _ in range(rng.choice([0, 1, rng.randint(2, 80)]))]
+    cgst, sgst = rng.choice(GST_RATES)
+    return items, rng.random() < 0.7, cgst, sgst
+
+@pytest.mark.parametrize("seed", range(CASES))
+def test_price_invoice_matches_decimal(seed):
+    items, gst_on, cgst, sgst = _random_invoice(seed)
+    priced = price_invoice(items, gst_on, cgst, sgst)
+
+    expected_lines = [_half_up(_dec(i["quantity"]) * _dec(i["unit_price"])) for i in items]
+    assert [_dec(i["amount"]) for i in priced["items"]] == expected_lines
+
+    subtotal = sum(expected_lines, Decimal(0))
+    assert _dec(priced["subtotal"]) == subtotal
+
+    expected_cgst = _half_up(subtotal * _dec(cgst) / 100) if gst_on else Decimal(0)
+    expected_sgst = _half_up(subtotal * _dec(sgst) / 100) if gst_on else Decimal(0)
+    assert _dec(priced["cgst_amount"]) == expected_cgst
+    assert _dec(priced["sgst_amount"]) == expected_sgst
+    assert _dec(priced["grand_total"]) == subtotal + expected_cgst + expected_sgst
+
+@pytest.mark.parametrize("seed", range(CASES))
+def test_totals_are_sums_of_parts(seed):
+    items, gst_on, cgst, sgst = _random_invoice(seed)
+    priced = price_invoice(items, gst_on, cgst, sgst)
+    lines = sum((_dec(i["amount"]) for i in priced["items"]), Decimal(0))
+    assert _dec(priced["subtotal"]) == lines
+    assert _dec(priced["grand_total"]) == (
+        _dec(priced["subtotal"]) + _dec(priced["cgst_amount"]) + _dec(priced["sgst_amount"])
+    )
+    # Input items are copied, never modified
+    assert all("amount" not in i for i in items)
+
+@pytest.mark.parametrize("seed", range(CASES))
+def test_item_amount_prices_legacy_items_like_price_invoice(seed):
+    items, _, _, _ = _random_invoice(seed)
+    priced = price_invoice(items)["items"]
+    assert [item_amount(i) for i in items] == [i["amount"] for i in priced]
+    assert [item_amount(i) for i in priced] == [i["amount"] for i in priced]
+
+def test_no_drift_over_many_lines():
+    items = [{"quantity": 1, "unit_price": 0.1}] * 100_000
+    assert price_invoice(items)["subtotal"] == 10000.0
+
+@pytest.mark.parametrize("quantity, unit_price, paise", [
+    (1, 1.005, 101),       # the price is rounded to the paisa first
+    (3, 0.1, 30),
+    (1.005, 19.99, 2009),  # 20.08995 rounds up
+    (0.5, 0.01, 1),        # half a paisa rounds up
+    (0.499, 0.01, 0),
+    (-2, 1.005, -202),     # half up is away from zero for credits too
+    ("2", "7.50", 1500),
+    (None, 5, 0),
+])
+def test_line_amount_rounding(quantity, unit_price, paise):
+    assert line_amount(quantity, unit_price) == paise
+
+@pytest.mark.parametrize("subtotal, percent, paise", [
+    (10000, 9, 900),
+    (5, 9, 0),             # 0.45 paise
+    (6, 9, 1),             # 0.54 paise
+    (50, 1, 1),            # exactly half a paisa
+    (12345, 2.5, 309),     # 308.625
+    (0, 18, 0),
+])
+def test_tax_rounding(subtotal, percent, paise):
+    assert tax(subtotal, percent) == paise
+
+# The builder reprices the whole grid on every rerun (see utils/pricing); the
+# bound is ~40x the measured time, so it only trips on a real regression
+LARGE_INVOICE_LINES = 5000
+LARGE_INVOICE_SECONDS = 0.5
+
+def test_large_invoice_prices_within_a_rerun():
+    rng = random.Random(0)
+    items = [_random_item(rng) for _ in range(LARGE_INVOICE_LINES)]
+    start = time.perf_counter()
+    price_invoice(items, True, 9, 9)
+    assert time.perf_counter() - start < LARGE_INVOICE_SECONDS
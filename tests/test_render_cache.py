@@ -0,0 +1,39 @@
+"""Bounds of the rendered-output cache (utils/render_cache)."""
+import os
+import time
+from utils import render_cache as rc
+from utils.render_cache import RenderCache
+
+def _files(directory) -> set:
+    return {name for _, _, names in os.walk(directory) for name in names}
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache = RenderCache(str(tmp_path), max_bytes=0, disk_bytes=250)
+    for key in ("aa1", "bb2"):
+        cache.put(key, "pdf", b"x" * 100)
+    assert cache.get("aa1", "pdf") == b"x" * 100  # aa1 is now the most recently used
+    cache.put("cc3", "pdf", b"x" * 100)
+    assert _files(tmp_path) == {"aa1.pdf", "cc3.pdf"}
+    assert cache.get("bb2", "pdf") is None
+
+def test_disk_tier_picks_up_existing_files_and_drops_expired_ones(tmp_path):
+    RenderCache(str(tmp_path)).put("aa1", "pdf", b"old")
+    RenderCache(str(tmp_path)).put("bb2", "pdf", b"new")
+    day_ago = time.time() - 86400
+    os.utime(tmp_path / "aa" / "aa1.pdf", (day_ago, day_ago))
+
+    cache = RenderCache(str(tmp_path), max_bytes=0, disk_bytes=10, max_age=3600)
+    cache.put("cc3", "pdf", b"x" * 5)
+    # aa1 expired; bb2 (3 bytes) and cc3 (5 bytes) fit under 10
+    assert _files(tmp_path) == {"bb2.pdf", "cc3.pdf"}
+    cache.put("dd4", "pdf", b"x" * 5)
+    assert _files(tmp_path) == {"cc3.pdf", "dd4.pdf"}
+
+def test_logo_hashes_are_evicted_one_at_a_time(monkeypatch):
+    monkeypatch.setattr(rc, "LOGO_HASH_CACHE_SIZE", 3)
+    monkeypatch.setattr(rc, "_logo_hashes", rc.OrderedDict())
+    for logo in ("a", "b", "c"):
+        rc._logo_hash(logo)
+    rc._logo_hash("a")
+    rc._logo_hash("d")
+    assert list(rc._logo_hashes) == ["c", "a", "d"]
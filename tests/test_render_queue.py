@@ -0,0 +1,47 @@
+"""Failure handling of the background PDF render queue (utils/render_queue)."""
+import os
+import time
+import pytest
+from utils import render_queue as rq
+from utils.render_cache import RenderCache
+from utils.render_queue import DONE, FAILED, RenderQueue
+
+def _fake_pdf(data: dict) -> bytes:
+    return b"%PDF " + data["invoice_number"].encode()
+
+def _crash(data: dict) -> bytes:
+    os._exit(1)
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(rq, "render_cache", RenderCache(str(tmp_path)))
+    monkeypatch.setattr(rq, "generate_pdf", _fake_pdf)
+    queue = RenderQueue(workers=1)
+    yield queue
+    queue.shutdown()
+
+def _wait(queue, job_id, timeout=60) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = queue.status(job_id)
+        if status["status"] in (DONE, FAILED):
+            return status
+        time.sleep(0.05)
+    raise AssertionError(f"job still {status['status']} after {timeout}s")
+
+def test_dead_worker_fails_the_job_and_replaces_the_pool(queue, monkeypatch):
+    monkeypatch.setattr(rq, "generate_pdf", _crash)
+    job = queue.submit({"invoice_number": "INV-0001"})
+    status = _wait(queue, job)
+    assert status["status"] == FAILED and "stopped unexpectedly" in status["error"]
+    assert queue._pool is None
+
+    monkeypatch.setattr(rq, "generate_pdf", _fake_pdf)
+    assert queue.submit({"invoice_number": "INV-0001"}) == job
+    assert _wait(queue, job)["status"] == DONE
+    assert queue.result(job) == b"%PDF INV-0001"
+
+def test_pdf_that_cannot_be_stored_fails_the_job(queue, monkeypatch):
+    monkeypatch.setattr(rq.render_cache, "put", lambda *args, **kwargs: False)
+    status = _wait(queue, queue.submit({"invoice_number": "INV-0002"}))
+    assert status["status"] == FAILED and status["error"] == "The rendered PDF could not be stored"
@@ -0,0 +1,18 @@
+"""Paged invoice search (utils/db.search_invoices_page) against a real SQLite database."""
+from utils.db import search_invoices_page
+from utils.sqlite_repository import SQLiteRepository
+
+def test_search_pages_cover_every_match_once(tmp_path):
+    db = SQLiteRepository(str(tmp_path / "search.db"))
+    user_id = db.create_profile({"email": "a@x", "status": "approved"})["id"]
+    db.insert_invoices([
+        {"user_id": user_id, "invoice_number": f"INV-{n:04d}", "client_name": "Acme Industries" if n % 3 else "Other"}
+        for n in range(23)
+    ])
+    seen, offset, pages = [], 0, 0
+    while offset is not None:
+        rows, offset = search_invoices_page(db, "acm ind", user_id=user_id, offset=offset, page_size=4)
+        seen += [r["invoice_number"] for r in rows]
+        pages += 1
+    assert pages == 4
+    assert sorted(seen) == [f"INV-{n:04d}" for n in range(23) if n % 3]
@@ -0,0 +1,33 @@
+"""User settings reads through the shared cache (utils/db) against a real SQLite database."""
+import base64
+import pytest
+from utils import db as settings_db
+from utils.db import get_user_settings
+from utils.sqlite_repository import SQLiteRepository
+
+@pytest.fixture
+def db(tmp_path):
+    return SQLiteRepository(str(tmp_path / "settings.db"))
+
+@pytest.fixture
+def user_id(db):
+    user_id = db.create_profile({"email": "a@x", "status": "approved"})["id"]
+    db.insert_settings({"user_id": user_id, "company_name": "Real Co", "invoice_counter": 42})
+    yield user_id
+    settings_db.invalidate_user_settings(user_id)
+
+@pytest.mark.parametrize("legacy_logo", ["not base64 at all!", base64.b64encode(b"not an image").decode()])
+def test_undecodable_legacy_logo_keeps_the_stored_settings(db, user_id, legacy_logo):
+    db.update_settings(user_id, {"company_logo_base64": legacy_logo})
+    settings = get_user_settings(db, user_id)
+    assert settings["company_name"] == "Real Co" and settings["invoice_counter"] == 42
+    assert settings["logo_hash"] is None
+    # Left unmigrated rather than thrown away
+    assert db.get_settings(user_id, "company_logo_base64")["company_logo_base64"] == legacy_logo
+
+def test_editing_nested_settings_leaves_the_cache_alone(db, user_id):
+    settings = get_user_settings(db, user_id)
+    settings["custom_columns"].append({"key": "x", "name": "X", "enabled": True})
+    settings["custom_columns"][0]["enabled"] = False
+    assert get_user_settings(db, user_id)["custom_columns"] == settings_db.DEFAULT_COLUMNS
+    assert settings_db.DEFAULT_COLUMNS[0]["enabled"] is True
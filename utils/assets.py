@@ -0,0 +1,122 @@
+import base64
+import hashlib
+import os
+import tempfile
+import threading
+from io import BytesIO
+
+# Bounding boxes (px) for the stored logo variants. Templates show the logo at
+# up to 200x80, so the preview is 2x that for sharp screens; print feeds the PDF.
+LOGO_VARIANTS = {"preview": (400, 160), "print": (1200, 480)}
+
+ASSET_CACHE_DIR = os.environ.get(
+    "INVOICE_ASSET_CACHE_DIR", os.path.join(tempfile.gettempdir(), "invoicepro-assets")
+)
+
+_memory = {}
+_uris = {}
+_known_hashes = set()
+_lock = threading.Lock()
+
+def _mime(data: bytes) -> str:
+    return "image/png" if data.startswith(b"\x89PNG") else "image/jpeg"
+
+def make_variants(raw: bytes) -> dict:
+    """Resize an uploaded image to every LOGO_VARIANTS box with Pillow.
+
+    Images with transparency stay PNG; everything else becomes a JPEG, which is
+    far smaller for the phone photos people tend to upload. Raises ValueError
+    if the upload can't be decoded (not an image, truncated, or oversized).
+    """
+    from PIL import Image, ImageOps
+
+    try:
+        src = ImageOps.exif_transpose(Image.open(BytesIO(raw)))
+        has_alpha = src.mode in ("RGBA", "LA", "PA") or (src.mode == "P" and "transparency" in src.info)
+        src = src.convert("RGBA" if has_alpha else "RGB")
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as e:
+        raise ValueError("The logo could not be read as a PNG or JPEG image.") from e
+    variants = {}
+    for name, box in LOGO_VARIANTS.items():
+        img = src.copy()
+        img.thumbnail(box, Image.LANCZOS)
+        out = BytesIO()
+        if has_alpha:
+            img.save(out, format="PNG", optimize=True)
+        else:
+            img.save(out, format="JPEG", quality=88, optimize=True)
+        variants[name] = (img.size, out.getvalue())
+    return variants
+
+def store_logo(db, raw: bytes) -> str:
+    """Store an uploaded logo content-addressed by its SHA-256 and return the hash.
+
+    Variants are generated only the first time a given image is seen, so the
+    same logo uploaded by several users is resized and stored once.
+    """
+    logo_hash = hashlib.sha256(raw).hexdigest()
+    if logo_hash in _known_hashes:
+        return logo_hash
+    if not db.has_logo_asset(logo_hash):
+        rows = []
+        for name, ((width, height), data) in make_variants(raw).items():
+            rows.append({
+                "hash": logo_hash, "variant": name, "mime": _mime(data),
+                "width": width, "height": height,
+                "data_base64": base64.b64encode(data).decode(),
+            })
+            _cache_put(logo_hash, name, data)
+        db.insert_logo_assets(rows, raw)
+    _known_hashes.add(logo_hash)
+    return logo_hash
+
+def _disk_path(logo_hash: str, variant: str) -> str:
+    return os.path.join(ASSET_CACHE_DIR, f"{logo_hash}-{variant}")
+
+def _cache_put(logo_hash: str, variant: str, data: bytes):
+    with _lock:
+        _memory[(logo_hash, variant)] = data
+    try:
+        os.makedirs(ASSET_CACHE_DIR, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=ASSET_CACHE_DIR)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, _disk_path(logo_hash, variant))
+    except OSError:
+        pass
+
+def cached_logo(logo_hash: str, variant: str = "preview"):
+    """Variant bytes from the local memory/disk cache, or None. Never queries the database."""
+    if not logo_hash:
+        return None
+    data = _memory.get((logo_hash, variant))
+    if data is None:
+        try:
+            with open(_disk_path(logo_hash, variant), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        with _lock:
+            _memory[(logo_hash, variant)] = data
+    return data
+
+def ensure_logo(db, logo_hash: str):
+    """Pull any variants of logo_hash missing from the local cache. Assets are
+    immutable, so once cached they never need fetching again."""
+    if not logo_hash or all(cached_logo(logo_hash, v) is not None for v in LOGO_VARIANTS):
+        return
+    try:
+        rows = db.get_logo_assets(logo_hash)
+    except:
+        return
+    for r in rows:
+        _cache_put(logo_hash, r["variant"], base64.b64decode(r["data_base64"]))
+
+def logo_data_uri(logo_hash: str, variant: str = "preview"):
+    uri = _uris.get((logo_hash, variant))
+    if uri is None:
+        data = cached_logo(logo_hash, variant)
+        if data is None:
+            return None
+        uri = _uris[(logo_hash, variant)] = f"data:{_mime(data)};base64,{base64.b64encode(data).decode()}"
+    return uri
@@ -1,6 +1,43 @@
 import streamlit as st
 import bcrypt
-from datetime import datetime, date
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, date, timedelta
+from utils.db import get_profile
+
+log = logging.getLogger(__name__)
+
+# Grants of access are cached per user for this long; a monthly user's entry
+# never outlives the moment their access_end_date lapses. Refusals aren't
+# cached, so a user approved on another process gets in on their next rerun.
+# Bounded like the settings cache (utils/db), least recently used out first.
+ACCESS_CACHE_TTL = 30
+ACCESS_CACHE_SIZE = 1024
+# user_id -> (valid_until, role)
+_access_cache = OrderedDict()
+_access_lock = threading.Lock()
+
+# Signed session tokens carry the profile fields a rerun needs, so restoring a
+# session after a refresh is a signature check rather than a profiles read
+SESSION_PARAM = "session"
+SESSION_TOKEN_TTL = 7 * 24 * 3600
+# Tokens this close to expiry are re-issued from a fresh profile read
+SESSION_REFRESH_WINDOW = 24 * 3600
+SESSION_FIELDS = ("id", "email", "full_name", "company_name", "role", "status", "access_type", "access_end_date")
+# user_id -> epoch time; tokens issued at or before it reload the profile.
+# Kept per process: behind several app processes, a revocation on one only
+# skips the token shortcut there. The others still bring status and role in
+# line with the profile within ACCESS_CACHE_TTL through check_access.
+_revoked = {}
+_session_secret = None
 
 def hash_password(password: str) -> str:
     return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
@@ -12,43 +49,163 @@ def logout():
     st.session_state.clear()
     st.query_params.clear()
 
-def check_access(supabase, user_id: str) -> bool:
-    try:
-        res = supabase.table("profiles").select(
-            "status,access_type,access_end_date"
-        ).eq("id", user_id).single().execute()
-        profile = res.data
-        if not profile:
-            return False
-        if profile["status"] != "approved":
+def _access_decision(profile) -> tuple:
+    """(allowed, lapses_at) for a profile; lapses_at is an epoch time or None."""
+    if not profile:
+        return False, None
+    if profile["status"] != "approved":
+        return False, None
+    if profile["access_type"] == "monthly" and profile.get("access_end_date"):
+        end_date = datetime.strptime(profile["access_end_date"], "%Y-%m-%d").date()
+        if date.today() > end_date:
+            return False, None
+        # Access runs through the whole of end_date
+        return True, datetime.combine(end_date + timedelta(days=1), datetime.min.time()).timestamp()
+    return True, None
+
+def invalidate_access(user_id: str):
+    """Drop a cached decision, e.g. after a Super Admin edits the profile."""
+    with _access_lock:
+        _access_cache.pop(user_id, None)
+
+def check_access(db, user_id: str) -> bool:
+    """Whether user_id may use the app; a grant is re-read from their profile at most every ACCESS_CACHE_TTL.
+
+    The session's role is brought in line with the profile too, since the
+    one in the session token can be days old.
+    """
+    now = time.time()
+    with _access_lock:
+        cached = _access_cache.get(user_id)
+        if cached:
+            _access_cache.move_to_end(user_id)
+    if cached and now < cached[0]:
+        allowed, role = True, cached[1]
+    else:
+        try:
+            profile = get_profile(db, user_id, "status,access_type,access_end_date,role")
+            allowed, lapses_at = _access_decision(profile)
+        except:
             return False
-        if profile["access_type"] == "monthly" and profile.get("access_end_date"):
-            end_date = datetime.strptime(profile["access_end_date"], "%Y-%m-%d").date()
-            if date.today() > end_date:
-                return False
-        return True
+        role = profile["role"] if profile else None
+        valid_until = now + ACCESS_CACHE_TTL
+        if lapses_at is not None:
+            valid_until = min(valid_until, lapses_at)
+        with _access_lock:
+            if allowed:
+                _access_cache[user_id] = (valid_until, role)
+                _access_cache.move_to_end(user_id)
+                while len(_access_cache) > ACCESS_CACHE_SIZE:
+                    _access_cache.popitem(last=False)
+            else:
+                _access_cache.pop(user_id, None)
+    if allowed:
+        _sync_role(role)
+    return allowed
+
+def _sync_role(role):
+    user = st.session_state.get("user")
+    if user and (user.get("role") != role or st.session_state.get("role") != role):
+        # Re-issue the token as well, so a refresh doesn't bring the old role back
+        _set_user({**user, "role": role})
+        save_session(st.session_state.user)
+
+def _get_secret() -> bytes:
+    """SESSION_SECRET from the environment or st.secrets.
+
+    Without one, sessions signed by this process don't validate in any other
+    process or after a restart, so the app refuses to run on Supabase (where
+    it may be served by several processes). The embedded SQLite backend is
+    for local use and falls back to a random per-process secret, with a warning.
+    """
+    global _session_secret
+    if _session_secret is None:
+        secret = os.environ.get("SESSION_SECRET")
+        if not secret:
+            try:
+                secret = st.secrets.get("SESSION_SECRET")
+            except:
+                secret = None
+        if not secret:
+            if os.environ.get("INVOICEPRO_BACKEND", "supabase") == "supabase":
+                raise RuntimeError("SESSION_SECRET is not set; sessions can't be signed")
+            log.warning("SESSION_SECRET is not set; sessions won't survive a restart")
+            secret = secrets.token_hex(32)
+        _session_secret = secret.encode()
+    return _session_secret
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def issue_session_token(profile: dict) -> str:
+    """An HMAC-SHA256 signed, expiring token embedding the session's profile fields."""
+    now = int(time.time())
+    payload = {k: profile.get(k) for k in SESSION_FIELDS}
+    payload.update(iat=now, exp=now + SESSION_TOKEN_TTL)
+    body = _b64(json.dumps(payload, separators=(",", ":")).encode())
+    sig = _b64(hmac.new(_get_secret(), body.encode(), hashlib.sha256).digest())
+    return f"{body}.{sig}"
+
+def read_session_token(token: str):
+    """The token's payload if the signature checks out and it has not expired, else None."""
+    secret = _get_secret()
+    try:
+        body, sig = token.split(".")
+        expected = _b64(hmac.new(secret, body.encode(), hashlib.sha256).digest())
+        if not hmac.compare_digest(sig, expected):
+            return None
+        payload = json.loads(_unb64(body))
     except:
-        return False
+        return None
+    if payload.get("exp", 0) <= time.time():
+        return None
+    return payload
+
+def revoke_session(user_id: str):
+    """Make this process reload user_id's profile instead of trusting tokens issued so far.
 
-def restore_session(supabase):
-    """Try to restore session from query params on page refresh."""
+    Only this process: see _revoked.
+    """
+    _revoked[user_id] = time.time()
+
+def _set_user(profile: dict):
+    st.session_state.user = profile
+    st.session_state.role = profile["role"]
+
+def restore_session(db):
+    """Try to restore session from the signed token in the query params on page refresh."""
+    # Fails the first run, not the first login, when there is no SESSION_SECRET
+    _get_secret()
     if st.session_state.get("user"):
         return True  # Already logged in
 
+    token = st.query_params.get(SESSION_PARAM)
+    payload = read_session_token(token) if token else None
+    if not payload or payload.get("status") != "approved":
+        return False
+
+    user_id = payload["id"]
+    stale = payload["iat"] <= _revoked.get(user_id, 0)
+    if not stale and payload["exp"] - time.time() > SESSION_REFRESH_WINDOW:
+        _set_user({k: payload.get(k) for k in SESSION_FIELDS})
+        return True
+
+    # Revoked or about to expire: re-read the profile and re-issue the token
     try:
-        user_id = st.query_params.get("uid")
-        if user_id:
-            res = supabase.table("profiles").select("*").eq(
-                "id", user_id
-            ).single().execute()
-            if res.data and res.data["status"] == "approved":
-                st.session_state.user = res.data
-                st.session_state.role = res.data["role"]
-                return True
+        profile = get_profile(db, user_id)
+        if profile and profile["status"] == "approved":
+            _set_user(profile)
+            save_session(profile)
+            return True
     except:
         pass
+    if SESSION_PARAM in st.query_params:
+        del st.query_params[SESSION_PARAM]
     return False
 
-def save_session(user_id: str):
-    """Save user_id to query params to persist across refresh."""
-    st.query_params["uid"] = user_id
+def save_session(profile: dict):
+    """Save a signed session token to query params to persist across refresh."""
+    st.query_params[SESSION_PARAM] = issue_session_token(profile)
@@ -0,0 +1,103 @@
+import multiprocessing
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from utils.pdf_generator import generate_pdf
+from utils.render_cache import render_cache, render_key
+
+def _render(invoice_data: dict) -> bytes:
+    # Module-level so it can be pickled into the worker processes
+    return generate_pdf(invoice_data)
+
+def pdf_filename(invoice_data: dict) -> str:
+    name = str(invoice_data.get("invoice_number") or invoice_data.get("id") or "invoice")
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", name) + ".pdf"
+
+def render_pdfs(invoices, workers: int = None):
+    """Render invoices to PDF in a process pool, yielding (invoice, pdf) as each finishes.
+
+    invoices is any iterable of effective invoice dicts (settings merged in).
+    Only a couple of renders per worker are in flight at once, so memory stays
+    bounded no matter how many invoices there are, and the iterable is only
+    consumed as fast as the workers keep up. PDFs already in the render cache
+    are yielded without rendering.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = workers * 2
+    source = iter(invoices)
+
+    # spawn rather than fork: the Streamlit server process is multi-threaded
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        pending = {}
+        ready = []
+
+        def fill():
+            for inv in source:
+                key = render_key(inv, inv.get("invoice_template", "classic"), "pdf")
+                cached = render_cache.get(key, "pdf")
+                if cached is not None:
+                    ready.append((inv, cached))
+                else:
+                    pending[pool.submit(_render, inv)] = (inv, key)
+                if len(pending) + len(ready) >= max_in_flight:
+                    return
+
+        fill()
+        while pending or ready:
+            yield from ready
+            ready.clear()
+            if not pending:
+                fill()
+                continue
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                inv, key = pending.pop(fut)
+                pdf = fut.result()
+                # Disk tier only: a month-end export would just flush the in-memory LRU
+                render_cache.put(key, "pdf", pdf, memory=False)
+                yield inv, pdf
+            fill()
+
+def _export(invoices, write, workers, progress) -> dict:
+    started = time.perf_counter()
+    done = 0
+    used_names = set()
+    for inv, pdf in render_pdfs(invoices, workers):
+        name, base, n = pdf_filename(inv), pdf_filename(inv), 1
+        while name in used_names:
+            n += 1
+            name = f"{base[:-4]}_{n}.pdf"
+        used_names.add(name)
+        write(name, pdf)
+        done += 1
+        if progress:
+            elapsed = time.perf_counter() - started
+            progress(done, done / elapsed if elapsed else 0.0)
+    seconds = time.perf_counter() - started
+    return {"count": done, "seconds": seconds, "per_second": done / seconds if seconds else 0.0}
+
+def export_pdfs_zip(invoices, dest, workers: int = None, progress=None) -> dict:
+    """Render invoices to PDF (see render_pdfs) and stream them into a ZIP.
+
+    invoices is any iterable of effective invoice dicts, e.g.
+    utils.db.iter_invoices_for_export. dest is a path or writable binary file.
+    Each PDF is written to the archive as soon as it finishes.
+    progress(done, per_second) is called after every PDF. Returns {"count",
+    "seconds", "per_second"}.
+    """
+    # PDF page streams are already compressed, so store rather than deflate
+    with zipfile.ZipFile(dest, "w", zipfile.ZIP_STORED) as zf:
+        return _export(invoices, zf.writestr, workers, progress)
+
+def export_pdfs_dir(invoices, directory: str, workers: int = None, progress=None) -> dict:
+    """Like export_pdfs_zip, but writes one file per invoice into directory."""
+    os.makedirs(directory, exist_ok=True)
+
+    def write(name, pdf):
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(pdf)
+
+    return _export(invoices, write, workers, progress)
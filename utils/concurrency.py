@@ -0,0 +1,42 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Threads shared by every session for fanning out independent queries. The work
+# is network-bound (or SQLite, which releases the GIL), so threads are enough.
+QUERY_WORKERS = int(os.environ.get("INVOICEPRO_QUERY_WORKERS", "8"))
+_THREAD_PREFIX = "invoicepro-query"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=QUERY_WORKERS, thread_name_prefix=_THREAD_PREFIX)
+    return _executor
+
+def gather(*calls, return_exceptions: bool = False) -> list:
+    """Run independent zero-argument calls concurrently; return their results in order.
+
+    Page latency becomes that of the slowest call rather than the sum of all of
+    them. With return_exceptions=True a failing call's exception is returned in
+    its slot instead of raised, so callers can degrade one section of a page.
+    Calls made from inside a gathered call run inline, so nesting can never
+    exhaust the pool.
+    """
+    if len(calls) <= 1 or threading.current_thread().name.startswith(_THREAD_PREFIX):
+        futures = None
+    else:
+        futures = [_pool().submit(call) for call in calls]
+    results = []
+    for i, call in enumerate(calls):
+        try:
+            results.append(futures[i].result() if futures else call())
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            results.append(e)
+    return results
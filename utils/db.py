@@ -1,5 +1,16 @@
-import streamlit as st
+import base64
+import copy
 import json
+import logging
+import threading
+import time
+from datetime import date
+from collections import OrderedDict
+from types import MappingProxyType
+from utils.assets import store_logo, ensure_logo
+from utils.concurrency import gather
+
+log = logging.getLogger(__name__)
 
 DEFAULT_COLUMNS = [
     {"key": "description", "name": "Description", "enabled": True},
@@ -8,6 +19,10 @@ DEFAULT_COLUMNS = [
     {"key": "unit_price", "name": "Unit Price (₹)", "enabled": True},
 ]
 
+# Line-item columns holding numbers, with their value in a new item; every
+# other column is free text
+NUMERIC_DEFAULTS = {"quantity": 1.0, "unit_price": 0.0}
+
 DEFAULT_SETTINGS = {
     "company_name": "Your Company Name",
     "invoice_title": "INVOICE",
@@ -15,7 +30,7 @@ DEFAULT_SETTINGS = {
     "phone_number": "",
     "website": "",
     "email": "",
-    "company_logo_base64": None,
+    "logo_hash": None,
     "gst_enabled": False,
     "cgst_percent": 9.0,
     "sgst_percent": 9.0,
@@ -25,46 +40,355 @@ DEFAULT_SETTINGS = {
     "custom_columns": DEFAULT_COLUMNS,
 }
 
-def get_user_settings(supabase, user_id: str) -> dict:
-    """Fetch user settings from Supabase, create defaults if not found."""
+# Everything but the legacy inline logo; legacy_logo_pending is a computed
+# column (sql/004) that flags rows whose base64 logo still needs migrating
+SETTINGS_COLUMNS = ",".join(["user_id", *DEFAULT_SETTINGS, "revision", "updated_at", "legacy_logo_pending"])
+
+# Process-wide settings cache shared by every session: user_id -> (revision, fresh_until, settings).
+# After SETTINGS_CACHE_TTL seconds an entry is revalidated with a one-column revision
+# read and only refetched if the revision moved (sql/005 bumps it on every update).
+SETTINGS_CACHE_TTL = 60
+SETTINGS_CACHE_SIZE = 1024
+_settings_cache = OrderedDict()
+_settings_lock = threading.Lock()
+
+def _migrate_legacy_logo(db, user_id: str) -> str:
+    """Move an inline company_logo_base64 into the logo asset store."""
+    row = db.get_settings(user_id, "company_logo_base64")
+    logo_hash = store_logo(db, base64.b64decode(row["company_logo_base64"]))
+    db.update_settings(user_id, {"logo_hash": logo_hash, "company_logo_base64": None})
+    return logo_hash
+
+def _hand_out(settings: dict) -> MappingProxyType:
+    """A read-only view of cached settings whose nested values (custom_columns) are copies.
+
+    The proxy alone is shallow: editing a shared custom_columns list in place
+    would change the settings of every session of that user.
+    """
+    return MappingProxyType({k: copy.deepcopy(v) if isinstance(v, (list, dict)) else v
+                             for k, v in settings.items()})
+
+def _cache_settings(user_id: str, settings: dict) -> MappingProxyType:
+    with _settings_lock:
+        _settings_cache[user_id] = (settings.get("revision"), time.monotonic() + SETTINGS_CACHE_TTL, settings)
+        _settings_cache.move_to_end(user_id)
+        while len(_settings_cache) > SETTINGS_CACHE_SIZE:
+            _settings_cache.popitem(last=False)
+    return _hand_out(settings)
+
+def invalidate_user_settings(user_id: str):
+    with _settings_lock:
+        _settings_cache.pop(user_id, None)
+
+def get_user_settings(db, user_id: str) -> MappingProxyType:
+    """User settings through the shared cache, as a read-only mapping.
+
+    Copy it (dict(...)) before editing; nested values are already this caller's own.
+    """
+    with _settings_lock:
+        entry = _settings_cache.get(user_id)
+        if entry:
+            _settings_cache.move_to_end(user_id)
+    if entry:
+        revision, fresh_until, settings = entry
+        if time.monotonic() < fresh_until:
+            return _hand_out(settings)
+        try:
+            if db.get_settings_revision(user_id) == revision:
+                with _settings_lock:
+                    _settings_cache[user_id] = (revision, time.monotonic() + SETTINGS_CACHE_TTL, settings)
+                return _hand_out(settings)
+        except:
+            pass
+    settings, stored = _fetch_user_settings(db, user_id)
+    if not stored:
+        # Defaults standing in for a failed read are never cached: that would show
+        # every session of this user the defaults (and let a Settings save write
+        # them) for a whole TTL. A stale copy beats the defaults meanwhile.
+        return _hand_out(entry[2] if entry else settings)
+    return _cache_settings(user_id, settings)
+
+def fetch_user_settings(db, user_id: str) -> dict:
+    """Fetch user settings from the database, create defaults if not found."""
+    return _fetch_user_settings(db, user_id)[0]
+
+def _fetch_user_settings(db, user_id: str) -> tuple:
+    """(settings, stored): stored is False when settings are defaults standing in for a failed read or insert."""
     try:
-        res = supabase.table("user_settings").select("*").eq("user_id", user_id).single().execute()
-        if res.data:
-            s = res.data
+        s = db.get_settings(user_id, SETTINGS_COLUMNS)
+        if s:
             if isinstance(s.get("custom_columns"), str):
                 s["custom_columns"] = json.loads(s["custom_columns"])
             if s.get("custom_columns") is None:
                 s["custom_columns"] = DEFAULT_COLUMNS
-            return s
+            legacy_logo = s.pop("legacy_logo_pending", False)
+            try:
+                if legacy_logo:
+                    s["logo_hash"] = _migrate_legacy_logo(db, user_id)
+                ensure_logo(db, s.get("logo_hash"))
+            except Exception:
+                # A logo that can't be decoded must not cost the user the row read
+                # above; a legacy one stays unmigrated and is retried on the next fetch
+                log.exception("Could not load the logo of user %s", user_id)
+            return s, True
+        stored = True
     except:
-        pass
+        stored = False
     # Create defaults
     defaults = {**DEFAULT_SETTINGS, "user_id": user_id}
     try:
-        supabase.table("user_settings").insert(defaults).execute()
+        db.insert_settings(defaults)
     except:
-        pass
-    return defaults
+        stored = False
+    return defaults, stored
 
-def save_user_settings(supabase, user_id: str, settings: dict):
-    """Upsert user settings."""
+def save_user_settings(db, user_id: str, settings: dict):
+    """Upsert user settings; the revision is bumped by the backend (sql/005 on Supabase).
+
+    The invoice counter is left alone: only the number allocator and
+    create_invoice write it, and a (possibly stale) cached copy must never move it back.
+    """
     settings["user_id"] = user_id
-    supabase.table("user_settings").upsert(settings, on_conflict="user_id").execute()
+    settings.pop("revision", None)
+    settings.pop("updated_at", None)
+    settings.pop("invoice_counter", None)
+    db.upsert_settings(settings)
+    invalidate_user_settings(user_id)
 
-def save_invoice(supabase, invoice_data: dict):
+def save_invoice(db, invoice_data: dict):
     """Save invoice to DB."""
-    return supabase.table("invoices").insert(invoice_data).execute()
+    return db.insert_invoice(invoice_data)
+
+def save_invoice_with_counter(db, invoice_data: dict, counter: int = None) -> dict:
+    """Insert an invoice and advance the counter in one transaction (sql/007 on Supabase).
+
+    Pass a counter reserved with allocate_invoice_numbers to use it instead of
+    taking the next one. Returns {"invoice_id", "invoice_number", "settings_revision"};
+    the cached settings are brought up to that revision without a refetch.
+    """
+    saved = db.create_invoice(invoice_data, counter)
+    _advance_cached_counter(invoice_data["user_id"], saved["settings_revision"], counter is None)
+    return saved
+
+def _advance_cached_counter(user_id: str, revision, advanced: bool):
+    """Mirror a counter advance into the cached settings so the next read needs no refetch.
+
+    Only safe when the save was the sole change since the cached revision;
+    otherwise the entry is dropped.
+    """
+    with _settings_lock:
+        entry = _settings_cache.get(user_id)
+    if not entry or entry[0] is None:
+        invalidate_user_settings(user_id)
+    elif advanced and entry[0] + 1 == revision:
+        settings = dict(entry[2])
+        settings["invoice_counter"] = int(settings.get("invoice_counter", 1)) + 1
+        settings["revision"] = revision
+        _cache_settings(user_id, settings)
+    elif advanced or entry[0] != revision:
+        invalidate_user_settings(user_id)
+
+# ── PROFILES & SIGNUPS ──
+def get_profile(db, user_id: str, columns: str = "*"):
+    return db.get_profile(user_id, columns)
+
+def get_profile_by_email(db, email: str):
+    return db.get_profile_by_email(email)
+
+def list_profiles(db):
+    return db.list_profiles()
+
+def update_profile(db, user_id: str, changes: dict):
+    db.update_profile(user_id, changes)
+
+def get_password_hash(db, email: str) -> str:
+    """The bcrypt hash stored with the user's signup request, or ""."""
+    row = db.get_signup_request(email, "raw_password")
+    return row.get("raw_password", "") if row else ""
+
+def create_signup_request(db, request: dict):
+    """Insert a pending signup request; raises DuplicateError for a known email."""
+    db.create_signup_request({**request, "status": "pending"})
+
+def list_signup_requests(db):
+    return db.list_signup_requests()
 
-def get_user_invoices(supabase, user_id: str):
-    return supabase.table("invoices").select("*").eq("user_id", user_id).order("created_at", desc=True).execute().data or []
+def approve_signup_request(db, request: dict, reviewer_id: str) -> dict:
+    """Create the requester's profile and default settings, and mark the request approved."""
+    profile = db.create_profile({
+        "email": request["email"],
+        "full_name": request["full_name"],
+        "company_name": request.get("company_name", ""),
+        "phone": request.get("phone", ""),
+        "role": "user",
+        "status": "approved",
+        "access_type": "permanent",
+    })
+    db.insert_settings({"user_id": profile["id"]})
+    db.update_signup_request(request["id"], {
+        "status": "approved", "reviewed_by": reviewer_id, "reviewed_at": str(date.today()),
+    })
+    return profile
 
-def get_all_invoices(supabase):
-    return supabase.table("invoices").select("*, profiles(full_name, company_name)").order("created_at", desc=True).execute().data or []
+def reject_signup_request(db, request_id: str, reviewer_id: str):
+    db.update_signup_request(request_id, {
+        "status": "rejected", "reviewed_by": reviewer_id, "reviewed_at": str(date.today()),
+    })
 
-def get_next_invoice_number(supabase, user_id: str, settings: dict) -> str:
-    counter = settings.get("invoice_counter", 1)
-    prefix = settings.get("invoice_prefix", "INV-")
+# Columns shown by list views; excludes the heavy items and terms_conditions payloads
+INVOICE_SUMMARY_COLUMNS = (
+    "id,user_id,invoice_number,client_name,issue_date,due_date,"
+    "subtotal,grand_total,invoice_status,template,created_at"
+)
+
+def get_user_invoices(db, user_id: str, columns: str = INVOICE_SUMMARY_COLUMNS):
+    return db.list_invoices(columns, user_id=user_id)
+
+def get_all_invoices(db, columns: str = INVOICE_SUMMARY_COLUMNS):
+    return db.list_invoices(columns, with_owner=True)
+
+def get_invoice_detail(db, invoice_id: str) -> dict:
+    """Fetch a single invoice, line items included."""
+    return db.get_invoice(invoice_id)
+
+def get_invoice_for_render(db, invoice_id: str, user_id: str) -> dict:
+    """An invoice merged with its owner's settings, ready for generate_pdf."""
+    inv, settings = gather(
+        lambda: get_invoice_detail(db, invoice_id),
+        lambda: get_user_settings(db, user_id),
+    )
+    return {**settings, **inv, "items": inv.get("items") or []}
+
+INVOICE_PAGE_SIZE = 25
+
+def get_invoices_page(db, user_id: str = None, status: str = None, search: str = None,
+                      cursor: dict = None, page_size: int = INVOICE_PAGE_SIZE, with_owner: bool = False,
+                      ids: list = None, issued_from: str = None, issued_to: str = None,
+                      columns: str = INVOICE_SUMMARY_COLUMNS):
+    """Fetch one page of invoices, newest first, keyset-paginated on (created_at, id).
+
+    Pass user_id=None to page over every user's invoices. Returns (rows, next_cursor);
+    next_cursor is None on the last page and is passed back in to fetch the next one.
+    """
+    # One extra row tells us whether another page exists without a count query
+    rows = db.list_invoices(
+        columns, user_id=user_id, status=status, search=search, cursor=cursor, limit=page_size + 1,
+        with_owner=with_owner, ids=ids, issued_from=issued_from, issued_to=issued_to,
+    )
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = {"created_at": rows[-1]["created_at"], "id": rows[-1]["id"]}
+    return rows, next_cursor
+
+SEARCH_RESULT_LIMIT = 200
+
+def search_invoices(db, query: str, user_id: str = None, status: str = None,
+                    limit: int = SEARCH_RESULT_LIMIT, columns: str = INVOICE_SUMMARY_COLUMNS,
+                    with_owner: bool = False, offset: int = 0):
+    """Ranked, indexed search over invoice number, client name and client email.
+
+    Every word of query matches as a prefix ("acm ind" finds "Acme Industries").
+    Backed by sql/008 on Supabase and an FTS5 index on SQLite.
+    """
+    query = (query or "").strip()
+    if not query:
+        return []
+    return db.search_invoices(query, columns, user_id=user_id, status=status, limit=limit,
+                              with_owner=with_owner, offset=offset)
+
+def search_invoices_page(db, query: str, user_id: str = None, status: str = None, offset: int = 0,
+                         page_size: int = INVOICE_PAGE_SIZE, with_owner: bool = False,
+                         columns: str = INVOICE_SUMMARY_COLUMNS):
+    """One page of search_invoices results, best match first.
+
+    Ranked results have no keyset to resume from, so pages are by offset.
+    Returns (rows, next_offset); next_offset is None on the last page.
+    """
+    rows = search_invoices(db, query, user_id=user_id, status=status, limit=page_size + 1,
+                           columns=columns, with_owner=with_owner, offset=offset)
+    next_offset = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_offset = offset + page_size
+    return rows, next_offset
+
+def iter_invoices_for_export(db, user_id: str = None, ids: list = None,
+                             issued_from: str = None, issued_to: str = None, batch_size: int = 200):
+    """Yield full invoices merged with their owner's settings, ready for generate_pdf.
+
+    Rows are fetched a page at a time so a large export never holds the whole set.
+    """
+    settings_by_user = {}
+    cursor = None
+    while True:
+        rows, cursor = get_invoices_page(
+            db, user_id=user_id, ids=ids, issued_from=issued_from, issued_to=issued_to,
+            cursor=cursor, page_size=batch_size, columns="*",
+        )
+        for inv in rows:
+            owner = inv["user_id"]
+            if owner not in settings_by_user:
+                settings_by_user[owner] = get_user_settings(db, owner)
+            yield {**settings_by_user[owner], **inv, "items": inv.get("items") or []}
+        if cursor is None:
+            return
+
+# ── LINE ITEMS ──
+# Served by the jsonb items and their GIN index on Supabase (sql/009) and by the
+# invoice_items table on SQLite; no invoice is loaded or parsed client-side.
+ITEM_QUERY_LIMIT = 200
+
+def find_invoices_by_serial(db, serial: str, user_id: str = None, limit: int = ITEM_QUERY_LIMIT,
+                            columns: str = INVOICE_SUMMARY_COLUMNS) -> list:
+    """Invoices with a line item whose Part Serial No is exactly serial, newest first."""
+    serial = (serial or "").strip()
+    if not serial:
+        return []
+    return db.find_invoices_by_serial(serial, columns, user_id=user_id, limit=limit)
+
+def revenue_by_description(db, user_id: str = None, status: str = None, issued_from: str = None,
+                           issued_to: str = None, limit: int = 50) -> list:
+    """Invoice count, quantity and revenue (the sum of the stored line amounts) per item description,
+    highest revenue first, aggregated in the database."""
+    rows = db.revenue_by_description(user_id=user_id, status=status, issued_from=issued_from,
+                                     issued_to=issued_to, limit=limit)
+    return [{
+        "description": r["description"],
+        "invoice_count": int(r["invoice_count"]),
+        "quantity": float(r["quantity"] or 0),
+        "revenue": float(r["revenue"] or 0),
+    } for r in rows]
+
+def get_invoice_totals(db) -> dict:
+    """Invoice count and revenue per status, aggregated in the database."""
+    rows = db.invoice_status_totals()
+    return {
+        r["invoice_status"]: {"count": int(r["invoice_count"]), "revenue": float(r["revenue"] or 0)}
+        for r in rows
+    }
+
+def get_recent_invoices(db, limit: int = 20):
+    return db.list_invoices(INVOICE_SUMMARY_COLUMNS, limit=limit, with_owner=True)
+
+def update_invoice_status(db, invoice_id: str, status: str):
+    db.update_invoice(invoice_id, {"invoice_status": status})
+
+def get_platform_stats(db) -> dict:
+    """User, invoice and pending-request counts for the Super Admin Stats tab."""
+    return db.platform_stats()
+
+def format_invoice_number(prefix: str, counter: int) -> str:
     return f"{prefix}{counter:04d}"
 
-def increment_invoice_counter(supabase, user_id: str, current_count: int):
-    supabase.table("user_settings").update({"invoice_counter": current_count + 1}).eq("user_id", user_id).execute()
\ No newline at end of file
+def get_next_invoice_number(db, user_id: str, settings: dict) -> str:
+    """The number the next save will most likely get. Not reserved; see utils/numbering."""
+    from utils.numbering import invoice_numbers
+    counter = invoice_numbers.peek(user_id) or settings.get("invoice_counter", 1)
+    return format_invoice_number(settings.get("invoice_prefix", "INV-"), counter)
+
+def allocate_invoice_numbers(db, user_id: str, count: int = 1) -> int:
+    """Atomically reserve count consecutive counter values (sql/006) and return the first."""
+    first = db.allocate_invoice_numbers(user_id, count)
+    invalidate_user_settings(user_id)
+    return first
\ No newline at end of file
@@ -0,0 +1,376 @@
+import csv
+import io
+import math
+import re
+import time
+from datetime import date, datetime
+from utils.db import (
+    DEFAULT_COLUMNS, NUMERIC_DEFAULTS, allocate_invoice_numbers, format_invoice_number, invalidate_user_settings,
+)
+from utils.pricing import price_invoice
+from utils.repository import DuplicateError
+
+# Invoices buffered per bulk insert. Memory is bounded by this and the current
+# invoice, never by the size of the file.
+IMPORT_CHUNK_SIZE = 500
+# Row errors kept for display; any beyond this are only counted
+MAX_REPORTED_ERRORS = 100
+# progress(rows, per_second) is called every this many rows
+PROGRESS_EVERY = 1000
+
+INVOICE_STATUSES = ("draft", "sent", "paid")
+
+# Header spellings accepted besides a column's key and display name
+ITEM_ALIASES = {
+    "description": ("item", "particulars", "product"),
+    "serial_no": ("serial", "serialnumber", "partno", "partnumber"),
+    "quantity": ("qty", "units"),
+    "unit_price": ("price", "rate", "unitcost"),
+}
+INVOICE_FIELDS = {
+    "invoice_number": ("invoice", "invoiceno", "billno"),
+    "client_name": ("client", "customer", "customername", "billto"),
+    "client_address": ("address", "customeraddress"),
+    "client_email": ("email", "customeremail"),
+    "client_phone": ("phone", "customerphone"),
+    "issue_date": ("date", "invoicedate", "issued"),
+    "due_date": ("due", "duedate"),
+    "invoice_status": ("status",),
+}
+
+def _norm(label) -> str:
+    return re.sub(r"[^a-z0-9]", "", str(label).lower())
+
+def read_rows(file, filename: str):
+    """Yield the rows of a CSV or XLSX file as lists of cells, one at a time.
+
+    XLSX needs the optional openpyxl package and is read in its streaming
+    read-only mode, so neither format is ever loaded whole.
+    """
+    if filename.lower().endswith((".xlsx", ".xlsm")):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ValueError("Reading .xlsx files needs openpyxl (pip install openpyxl); upload a CSV instead.")
+        wb = load_workbook(file, read_only=True, data_only=True)
+        try:
+            for row in wb.active.iter_rows(values_only=True):
+                yield ["" if v is None else v for v in row]
+        finally:
+            wb.close()
+    else:
+        text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+        try:
+            yield from csv.reader(text)
+        finally:
+            # Leave the caller's file open (if it still is)
+            if not text.closed:
+                text.detach()
+
+def map_columns(header: list, columns: list, fields=()) -> dict:
+    """Match header cells to keys: {key: cell index}.
+
+    A header matches one of the user's custom_columns by its key, its display
+    name or a common alias ("Qty", "Rate"); fields adds invoice-level fields
+    from INVOICE_FIELDS. Matching ignores case, spaces and punctuation.
+    """
+    wanted = {}
+    for c in columns:
+        for label in (c["key"], c["name"], *ITEM_ALIASES.get(c["key"], ())):
+            wanted.setdefault(_norm(label), c["key"])
+    for f in fields:
+        for label in (f, *INVOICE_FIELDS[f]):
+            wanted.setdefault(_norm(label), f)
+    mapping = {}
+    for idx, cell in enumerate(header):
+        key = wanted.get(_norm(cell))
+        if key and key not in mapping:
+            mapping[key] = idx
+    return mapping
+
+def _cell(cells: list, mapping: dict, key: str):
+    idx = mapping.get(key)
+    return cells[idx] if idx is not None and idx < len(cells) else ""
+
+def _number(value):
+    if isinstance(value, (int, float)):
+        number = float(value)
+    else:
+        try:
+            number = float(value)
+        except ValueError:
+            # Drop currency symbols and thousands separators ("₹1,250.00")
+            text = re.sub(r"[^0-9.\-]", "", value)
+            if not text:
+                if value.strip():
+                    raise ValueError(value)
+                return None
+            number = float(text)
+    # float() takes "nan", "inf" and "1e400"; none of them can be priced
+    if not math.isfinite(number):
+        raise ValueError(value)
+    return number
+
+def _date(value):
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    text = str(value).strip()
+    if not text:
+        return None
+    try:
+        return date.fromisoformat(text).isoformat()
+    except ValueError:
+        pass
+    for fmt in ("%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y"):
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            pass
+    raise ValueError(f"unrecognised date {text!r}")
+
+def parse_item(values: dict, keys: list):
+    """The validated line item in values ({key: raw cell}), or None if its cells are all blank.
+
+    Raises ValueError for a quantity or price that is not a non-negative number.
+    """
+    values = {k: values.get(k, "") for k in keys}
+    if all(str(v).strip() == "" for v in values.values()):
+        return None
+    item = {}
+    for k, v in values.items():
+        if k in NUMERIC_DEFAULTS:
+            try:
+                n = _number(v)
+            except ValueError:
+                raise ValueError(f"{k} is not a number: {v!r}")
+            if n is not None and n < 0:
+                raise ValueError(f"{k} is negative")
+            item[k] = NUMERIC_DEFAULTS[k] if n is None else n
+        else:
+            item[k] = str(v).strip()
+    return item
+
+def invoice_fields(values: dict) -> dict:
+    """The validated client, date and status fields in values ({field: raw value}).
+
+    Issue date defaults to today and due date to the issue date. Raises ValueError.
+    """
+    status = str(values.get("invoice_status") or "").strip().lower() or "draft"
+    if status not in INVOICE_STATUSES:
+        raise ValueError(f"unknown status {status!r}")
+    issue_date = _date(values.get("issue_date") or "") or date.today().isoformat()
+    return {
+        "client_name": str(values.get("client_name") or "").strip(),
+        "client_address": str(values.get("client_address") or "").strip(),
+        "client_email": str(values.get("client_email") or "").strip(),
+        "client_phone": str(values.get("client_phone") or "").strip(),
+        "issue_date": issue_date,
+        "due_date": _date(values.get("due_date") or "") or issue_date,
+        "invoice_status": status,
+    }
+
+def invoice_record(user_id: str, settings: dict, fields: dict, items: list, invoice_number: str = None) -> dict:
+    """An invoices row for validated fields and items, priced with the tax rates from settings."""
+    gst_on = bool(settings.get("gst_enabled", False))
+    cgst_pct = float(settings.get("cgst_percent", 9.0))
+    sgst_pct = float(settings.get("sgst_percent", 9.0))
+    return {
+        "user_id": user_id,
+        "invoice_number": invoice_number,
+        **fields,
+        **price_invoice(items, gst_on, cgst_pct, sgst_pct),
+        "gst_enabled": gst_on,
+        "cgst_percent": cgst_pct,
+        "sgst_percent": sgst_pct,
+        "terms_conditions": settings.get("terms_conditions", ""),
+        "template": settings.get("invoice_template", "classic"),
+    }
+
+def enabled_columns(settings: dict) -> list:
+    return [c for c in settings.get("custom_columns") or DEFAULT_COLUMNS if c.get("enabled")]
+
+class ImportReport:
+    """Row counting, error collection and rate reporting for an import.
+
+    progress(rows, per_second) is called every PROGRESS_EVERY rows.
+    """
+
+    def __init__(self, progress=None):
+        self.progress = progress
+        self.started = time.perf_counter()
+        self.rows = 0
+        self.errors = []
+        self.error_count = 0
+
+    def row(self):
+        self.rows += 1
+        if self.progress and self.rows % PROGRESS_EVERY == 0:
+            self.progress(self.rows, self.per_second())
+
+    def error(self, line, message: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    def per_second(self) -> float:
+        elapsed = time.perf_counter() - self.started
+        return self.rows / elapsed if elapsed else 0.0
+
+    def result(self, **extra) -> dict:
+        seconds = time.perf_counter() - self.started
+        return {
+            "rows": self.rows, "errors": self.errors, "error_count": self.error_count,
+            "seconds": seconds, "per_second": self.rows / seconds if seconds else 0.0, **extra,
+        }
+
+def _open(file, filename: str, columns: list, fields=()):
+    rows = read_rows(file, filename)
+    header = next(rows, None)
+    if header is None:
+        raise ValueError("The file is empty.")
+    mapping = map_columns(header, columns, fields)
+    if not any(c["key"] in mapping for c in columns):
+        raise ValueError("No column in the file matches your line-item columns ("
+                         + ", ".join(c["name"] for c in columns) + ").")
+    return mapping, rows
+
+def import_items(file, filename: str, columns: list, progress=None) -> dict:
+    """Parse a file of line items for the invoice builder.
+
+    columns are the enabled custom_columns. Returns {"items", "rows", "errors",
+    "error_count", "seconds", "per_second"}; errors are (line, message) pairs
+    for the rows that were skipped.
+    """
+    keys = [c["key"] for c in columns]
+    mapping, rows = _open(file, filename, columns)
+    report = ImportReport(progress)
+    items = []
+    for line, cells in enumerate(rows, start=2):
+        report.row()
+        try:
+            item = parse_item({k: _cell(cells, mapping, k) for k in keys}, keys)
+        except ValueError as e:
+            report.error(line, str(e))
+            continue
+        if item:
+            items.append(item)
+    return report.result(items=items)
+
+def parse_invoice_rows(file, filename: str, user_id: str, settings: dict, report: ImportReport):
+    """Yield an invoices row for each invoice in a file with one row per line item.
+
+    An "Invoice" column groups the rows of each invoice, which must be
+    consecutive; client, date and status columns are read from an invoice's
+    first row. invoice_number is the file's own value. A row with an invalid
+    item is skipped; an invalid client, date or status skips the whole
+    invoice. Both are recorded in report.
+    """
+    columns = enabled_columns(settings)
+    keys = [c["key"] for c in columns]
+    mapping, rows = _open(file, filename, columns, INVOICE_FIELDS)
+    if "invoice_number" not in mapping:
+        raise ValueError('Invoice imports need an "Invoice" column identifying the invoice of each row.')
+
+    seen = set()
+    # [ref, fields, items]; fields is None for an invoice whose first row is invalid
+    current = None
+    line = 1
+    for line, cells in enumerate(rows, start=2):
+        report.row()
+        try:
+            ref = str(_cell(cells, mapping, "invoice_number")).strip()
+            if not ref:
+                if parse_item({k: _cell(cells, mapping, k) for k in keys}, keys):
+                    raise ValueError("no invoice given")
+                continue
+            # The invoice's fields come from its first row even when that row's item is invalid
+            if current is None or ref != current[0]:
+                if ref in seen:
+                    raise ValueError(f"rows of invoice {ref} are not together")
+                if current is not None and current[1] is not None:
+                    if current[2]:
+                        yield invoice_record(user_id, settings, current[1], current[2], current[0])
+                    else:
+                        report.error(line - 1, f"invoice {current[0]} has no valid items")
+                seen.add(ref)
+                current = [ref, None, []]
+                current[1] = invoice_fields({f: _cell(cells, mapping, f) for f in INVOICE_FIELDS})
+            if current[1] is None:
+                continue
+            item = parse_item({k: _cell(cells, mapping, k) for k in keys}, keys)
+            if item:
+                current[2].append(item)
+        except ValueError as e:
+            report.error(line, str(e))
+    if current is not None and current[1] is not None:
+        if current[2]:
+            yield invoice_record(user_id, settings, current[1], current[2], current[0])
+        else:
+            report.error(line, f"invoice {current[0]} has no valid items")
+
+def _counter_after(records, prefix: str):
+    """One past the highest counter among the records' invoice numbers written
+    with prefix (as format_invoice_number does), or None if none are."""
+    counters = [
+        int(number[len(prefix):]) for number in (r["invoice_number"] for r in records)
+        if number.startswith(prefix) and re.fullmatch(r"[0-9]+", number[len(prefix):])
+    ]
+    return max(counters) + 1 if counters else None
+
+def save_invoices(db, user_id: str, records, settings: dict, report: ImportReport,
+                  keep_numbers: bool = False, chunk_size: int = IMPORT_CHUNK_SIZE):
+    """Insert invoices rows chunk_size at a time with one multi-row insert each,
+    yielding every row once it is saved.
+
+    Rows get numbers from the user's counter, reserved a chunk at a time,
+    unless keep_numbers keeps their own (e.g. when migrating history); the
+    counter is then raised past the kept numbers that use the user's prefix,
+    in the same transaction as each insert. A row whose number is already
+    taken is skipped and recorded in report.
+    """
+    prefix = settings.get("invoice_prefix", "INV-")
+    chunk = []
+
+    def flush():
+        if not keep_numbers:
+            first = allocate_invoice_numbers(db, user_id, len(chunk))
+            for i, record in enumerate(chunk):
+                record["invoice_number"] = format_invoice_number(prefix, first + i)
+        try:
+            db.insert_invoices(chunk, _counter_after(chunk, prefix) if keep_numbers else None)
+            saved = list(chunk)
+        except DuplicateError:
+            # Nothing from the chunk went in; retry one by one to skip only the clashes
+            saved = []
+            for record in chunk:
+                try:
+                    db.insert_invoices([record], _counter_after([record], prefix) if keep_numbers else None)
+                    saved.append(record)
+                except DuplicateError:
+                    report.error(None, f"invoice {record['invoice_number']} already exists")
+        if keep_numbers and saved:
+            invalidate_user_settings(user_id)
+        chunk.clear()
+        return saved
+
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield from flush()
+    if chunk:
+        yield from flush()
+
+def import_invoices(db, user_id: str, file, filename: str, settings: dict,
+                    keep_numbers: bool = False, chunk_size: int = IMPORT_CHUNK_SIZE, progress=None) -> dict:
+    """Bulk-create invoices from a file with one row per line item; see
+    parse_invoice_rows for the layout and save_invoices for numbering.
+
+    Memory is bounded by one chunk, never by the size of the file. Returns
+    {"invoices", "rows", "errors", "error_count", "seconds", "per_second"}.
+    """
+    report = ImportReport(progress)
+    records = parse_invoice_rows(file, filename, user_id, settings, report)
+    saved = sum(1 for _ in save_invoices(db, user_id, records, settings, report, keep_numbers, chunk_size))
+    return report.result(invoices=saved)
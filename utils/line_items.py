@@ -0,0 +1,45 @@
+import csv
+import io
+import numpy as np
+import pandas as pd
+from utils.db import NUMERIC_DEFAULTS
+
+def blank_item(keys) -> dict:
+    return {k: NUMERIC_DEFAULTS.get(k, "") for k in keys}
+
+def normalize_frame(frame: pd.DataFrame, keys) -> pd.DataFrame:
+    """Give frame exactly the columns in keys, numeric columns as finite floats and
+    blanks (e.g. rows just added in the grid) filled with the blank_item values."""
+    frame = frame.reindex(columns=list(keys))
+    for k in keys:
+        if k in NUMERIC_DEFAULTS:
+            # "inf" and "1e400" parse as numbers but can't be priced; treat them as blank
+            numbers = pd.to_numeric(frame[k], errors="coerce").replace([np.inf, -np.inf], np.nan)
+            frame[k] = numbers.fillna(NUMERIC_DEFAULTS[k]).astype(float)
+        else:
+            frame[k] = frame[k].fillna("").astype(str)
+    return frame.reset_index(drop=True)
+
+def items_frame(items: list, keys) -> pd.DataFrame:
+    """The columnar form of a list of item dicts, one column per key."""
+    return normalize_frame(pd.DataFrame.from_records(items, columns=list(keys)), keys)
+
+def frame_items(frame: pd.DataFrame) -> list:
+    return frame.to_dict("records")
+
+def parse_rows(text: str, keys) -> pd.DataFrame:
+    """Rows pasted from a spreadsheet (tab-separated) or typed as CSV, columns in keys order.
+
+    Missing trailing cells get the blank_item values; extra cells are dropped.
+    """
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        return normalize_frame(pd.DataFrame(columns=list(keys)), keys)
+    delimiter = "\t" if any("\t" in line for line in lines) else ","
+    rows = [row[:len(keys)] for row in csv.reader(io.StringIO("\n".join(lines)), delimiter=delimiter)]
+    frame = pd.DataFrame.from_records([dict(zip(keys, row)) for row in rows], columns=list(keys))
+    for k in NUMERIC_DEFAULTS:
+        if k in frame:
+            # Spreadsheets paste prices like "₹1,250.00"
+            frame[k] = frame[k].fillna("").astype(str).str.replace(r"[^0-9.\-]", "", regex=True)
+    return normalize_frame(frame, keys)
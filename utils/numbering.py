@@ -0,0 +1,85 @@
+import os
+import heapq
+import threading
+from utils.db import allocate_invoice_numbers
+
+# How many numbers one server round trip reserves for this process (hi-lo).
+# 1 keeps the sequence dense; larger blocks suit busy multi-user workers.
+INVOICE_NUMBER_BLOCK = int(os.environ.get("INVOICE_NUMBER_BLOCK", "1"))
+
+# "reuse": a number released after a failed save goes back to the pool and is
+#          handed out again, so the sequence stays as dense as possible.
+# "gaps":  released numbers are dropped; numbers only ever increase per process.
+# Unused numbers in a reserved block are lost when the process exits either way.
+INVOICE_NUMBER_POLICY = os.environ.get("INVOICE_NUMBER_POLICY", "reuse")
+
+class InvoiceNumberAllocator:
+    """Hands out invoice counter values from blocks reserved atomically in the database.
+
+    Every block comes from allocate_invoice_numbers (sql/006), so blocks held by
+    different processes never overlap and no number is issued twice.
+    """
+
+    def __init__(self, block_size: int = INVOICE_NUMBER_BLOCK, policy: str = INVOICE_NUMBER_POLICY):
+        if policy not in ("reuse", "gaps"):
+            raise ValueError(f"Unknown invoice number policy: {policy}")
+        self.block_size = max(1, block_size)
+        self.policy = policy
+        self._pools = {}
+        # _lock guards the pools and is never held across a database call; a
+        # user's refill runs under that user's own lock, so one slow
+        # allocation only holds up numbers for the same user
+        self._lock = threading.Lock()
+        self._user_locks = {}
+
+    def _user_lock(self, user_id: str) -> threading.Lock:
+        with self._lock:
+            return self._user_locks.setdefault(user_id, threading.Lock())
+
+    def _pop(self, user_id: str):
+        with self._lock:
+            pool = self._pools.get(user_id)
+            return heapq.heappop(pool) if pool else None
+
+    def allocate(self, db, user_id: str) -> int:
+        """Take the lowest number this process holds for user_id, reserving a new block if empty."""
+        number = self._pop(user_id)
+        if number is not None:
+            return number
+        with self._user_lock(user_id):
+            # Another thread may have refilled the pool while this one waited
+            number = self._pop(user_id)
+            if number is not None:
+                return number
+            first = allocate_invoice_numbers(db, user_id, self.block_size)
+            with self._lock:
+                pool = self._pools.setdefault(user_id, [])
+                for n in range(first, first + self.block_size):
+                    heapq.heappush(pool, n)
+                return heapq.heappop(pool)
+
+    def take(self, db, user_id: str):
+        """A number for the next save, or None to let the save take one itself.
+
+        With single-number blocks and nothing pooled, create_invoice (sql/007)
+        advances the counter in the same transaction as the insert, saving the
+        separate allocation round trip.
+        """
+        if self.block_size == 1:
+            return self._pop(user_id)
+        return self.allocate(db, user_id)
+
+    def release(self, user_id: str, number: int):
+        """Return a number whose invoice was never stored, subject to the policy."""
+        if self.policy != "reuse":
+            return
+        with self._lock:
+            heapq.heappush(self._pools.setdefault(user_id, []), number)
+
+    def peek(self, user_id: str):
+        """The number allocate() would hand out next from the local pool, or None."""
+        with self._lock:
+            pool = self._pools.get(user_id)
+            return pool[0] if pool else None
+
+invoice_numbers = InvoiceNumberAllocator()
@@ -2,16 +2,70 @@ from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.lib.styles import ParagraphStyle
 from reportlab.lib.units import mm
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
 from reportlab.lib.enums import TA_RIGHT, TA_CENTER
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from xml.sax.saxutils import escape
 from io import BytesIO
+from utils.assets import cached_logo
+from utils.pricing import item_amount
+
+# Item table cells share these styles instead of building one per cell
+CELL_FONT_SIZE = 8
+CELL_LEADING = 12
+_cell_style = ParagraphStyle('cell', fontSize=CELL_FONT_SIZE, leading=CELL_LEADING)
+_head_style = ParagraphStyle('head', fontSize=CELL_FONT_SIZE, leading=CELL_LEADING, textColor=colors.white)
+
+# Item table cell padding on every side
+CELL_PADDING = 7
+# Frame padding SimpleDocTemplate puts around the page body, plus a little slack
+# so a page-sized chunk never spills onto the next page by a rounding error
+_FRAME_SLACK = 12 + 4
+# The commands that decide row heights, for measuring rows on their own
+_measure_style = TableStyle([
+    ('FONTSIZE', (0, 0), (-1, -1), CELL_FONT_SIZE),
+    ('LEADING', (0, 0), (-1, -1), CELL_LEADING),
+    ('PADDING', (0, 0), (-1, -1), CELL_PADDING),
+])
+
+def _item_cell(val: str, width: float):
+    """A plain string when the value fits on one line, a wrapping Paragraph otherwise.
+
+    Either way the value shows as literal text: the Paragraph gets it escaped,
+    with its line breaks kept.
+    """
+    if "\n" not in val and stringWidth(val, 'Helvetica', CELL_FONT_SIZE) <= width - 2 * CELL_PADDING:
+        return val
+    return Paragraph(escape(val).replace("\n", "<br/>"), _cell_style)
+
+def _row_height(row: list, col_widths: list, avail_width: float) -> float:
+    table = Table([row], colWidths=col_widths)
+    table.setStyle(_measure_style)
+    return table.wrap(avail_width, 0)[1]
+
+def _page_chunks(rows, heights, first_avail: float, page_avail: float):
+    """Split rows into runs that each fill the rest of a page; returns (first row index, rows) pairs.
+
+    Every chunk becomes its own Table, so ReportLab never has to re-split (and
+    re-measure) one huge table once per page.
+    """
+    chunks, start, used, avail = [], 0, 0.0, first_avail
+    for i, h in enumerate(heights):
+        if used + h > avail and i > start:
+            chunks.append((start, rows[start:i]))
+            start, used, avail = i, 0.0, page_avail
+        used += h
+    chunks.append((start, rows[start:]))
+    return chunks
 
 def generate_pdf(invoice_data: dict) -> bytes:
     buffer = BytesIO()
     doc = SimpleDocTemplate(
         buffer, pagesize=A4,
         rightMargin=15*mm, leftMargin=15*mm,
-        topMargin=15*mm, bottomMargin=15*mm
+        topMargin=15*mm, bottomMargin=15*mm,
+        # Fixed timestamps/IDs so identical input gives byte-identical output (see utils/render_cache)
+        invariant=1
     )
     elements = []
 
@@ -31,11 +85,17 @@ def generate_pdf(invoice_data: dict) -> bytes:
         return ParagraphStyle(name, **kwargs)
 
     # ── HEADER ──────────────────────────────────────────
+    company = [Paragraph(
+        f"<b>{invoice_data.get('company_name','')}</b>",
+        style('co', fontSize=18, leading=22, textColor=white)
+    )]
+    logo = cached_logo(invoice_data.get("logo_hash"), "print")
+    if logo:
+        img = Image(BytesIO(logo), width=50*mm, height=20*mm, kind='proportional')
+        img.hAlign = 'LEFT'
+        company = [img, Spacer(1, 3*mm)] + company
     header_data = [[
-        Paragraph(
-            f"<b>{invoice_data.get('company_name','')}</b>",
-            style('co', fontSize=18, textColor=white)
-        ),
+        company,
         Paragraph(
             f"<b>{invoice_data.get('invoice_title','INVOICE')}</b><br/>"
             f"<font size=11>#{invoice_data.get('invoice_number','')}</font>",
@@ -79,27 +139,6 @@ def generate_pdf(invoice_data: dict) -> bytes:
     enabled_cols = [c for c in invoice_data.get("custom_columns", []) if c.get("enabled")]
     col_names = ["#"] + [c["name"] for c in enabled_cols] + ["Amount"]
 
-    header_row = [
-        Paragraph(f"<b>{n}</b>", style(f'h{i}', fontSize=8, textColor=white))
-        for i, n in enumerate(col_names)
-    ]
-    items_data = [header_row]
-
-    for idx, item in enumerate(invoice_data.get("items", [])):
-        amount = float(item.get("quantity", 0)) * float(item.get("unit_price", 0))
-        row = [Paragraph(str(idx + 1), style(f'r{idx}0', fontSize=8))]
-        for col in enabled_cols:
-            key = col["key"]
-            if key == "quantity":
-                val = f"{float(item.get(key, 0)):.2f}"
-            elif key == "unit_price":
-                val = f"\u20b9{float(item.get(key, 0)):.2f}"
-            else:
-                val = str(item.get(key, ""))
-            row.append(Paragraph(val, style(f'r{idx}{key}', fontSize=8)))
-        row.append(Paragraph(f"\u20b9{amount:.2f}", style(f'r{idx}amt', fontSize=8, alignment=TA_RIGHT)))
-        items_data.append(row)
-
     # Column widths
     desc_w = 45*mm
     other_w = 25*mm
@@ -107,20 +146,59 @@ def generate_pdf(invoice_data: dict) -> bytes:
     amt_w = 25*mm
     col_widths = [num_w] + [desc_w if c["key"] == "description" else other_w for c in enabled_cols] + [amt_w]
 
-    tbl = Table(items_data, colWidths=col_widths, repeatRows=1)
-    tbl.setStyle(TableStyle([
+    header_row = [Paragraph(f"<b>{n}</b>", _head_style) for n in col_names]
+
+    item_rows = []
+    for idx, item in enumerate(invoice_data.get("items", [])):
+        amount = item_amount(item)
+        row = [str(idx + 1)]
+        for col, width in zip(enabled_cols, col_widths[1:]):
+            key = col["key"]
+            if key == "quantity":
+                row.append(f"{float(item.get(key, 0)):.2f}")
+            elif key == "unit_price":
+                row.append(f"\u20b9{float(item.get(key, 0)):.2f}")
+            else:
+                row.append(_item_cell(str(item.get(key, "")), width))
+        row.append(f"\u20b9{amount:.2f}")
+        item_rows.append(row)
+
+    stripes = [white, colors.HexColor("#f5f5f5")]
+    items_commands = [
         ('BACKGROUND', (0, 0), (-1, 0), primary),
         ('TEXTCOLOR', (0, 0), (-1, 0), white),
         ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 8),
-        ('PADDING', (0, 0), (-1, -1), 7),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [white, colors.HexColor("#f5f5f5")]),
+        ('FONTSIZE', (0, 0), (-1, -1), CELL_FONT_SIZE),
+        ('LEADING', (0, 0), (-1, -1), CELL_LEADING),
+        ('PADDING', (0, 0), (-1, -1), CELL_PADDING),
         ('GRID', (0, 0), (-1, -1), 0.4, colors.HexColor("#dddddd")),
         ('ALIGN', (-1, 0), (-1, -1), 'RIGHT'),
         ('ALIGN', (0, 0), (0, -1), 'CENTER'),
         ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
-    elements.append(tbl)
+    ]
+
+    # Measure the rows, then lay them out as page-sized tables. Rows of plain
+    # one-line strings all have the same height, so one of them is measured for all.
+    header_h = _row_height(header_row, col_widths, doc.width)
+    plain_h = None
+    heights = []
+    for row in item_rows:
+        if any(isinstance(cell, Paragraph) for cell in row):
+            heights.append(_row_height(row, col_widths, doc.width))
+        else:
+            if plain_h is None:
+                plain_h = _row_height(row, col_widths, doc.width)
+            heights.append(plain_h)
+
+    page_avail = doc.height - _FRAME_SLACK - header_h
+    first_avail = page_avail - sum(e.wrap(doc.width, doc.height)[1] for e in elements)
+    for start, chunk in _page_chunks(item_rows, heights, first_avail, page_avail):
+        tbl = Table([header_row] + chunk, colWidths=col_widths, repeatRows=1)
+        # Stripes continue from the previous chunk rather than restarting on each page
+        tbl.setStyle(TableStyle(items_commands + [
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), stripes[start % 2:] + stripes[:start % 2]),
+        ]))
+        elements.append(tbl)
     elements.append(Spacer(1, 5*mm))
 
     # ── TOTALS ────────────────────────────────────────────
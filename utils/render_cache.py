@@ -0,0 +1,225 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from utils.templates import render_invoice
+from utils.pdf_generator import generate_pdf
+
+# Bump when template or PDF output changes so stale entries stop matching
+RENDER_CACHE_VERSION = 3
+
+# Rendered invoices are customer documents, so by default they go to a
+# directory private to this user rather than the shared system temp dir
+RENDER_CACHE_DIR = os.environ.get(
+    "INVOICE_RENDER_CACHE_DIR",
+    os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "invoicepro", "renders"),
+)
+RENDER_CACHE_MEMORY_BYTES = int(os.environ.get("INVOICE_RENDER_CACHE_MB", "64")) * 1024 * 1024
+# The files are evicted least recently used first beyond this many bytes, and
+# dropped at startup once older than RENDER_CACHE_MAX_AGE seconds
+RENDER_CACHE_DISK_BYTES = int(os.environ.get("INVOICE_RENDER_CACHE_DISK_MB", "1024")) * 1024 * 1024
+RENDER_CACHE_MAX_AGE = int(os.environ.get("INVOICE_RENDER_CACHE_DAYS", "30")) * 86400
+
+LOGO_HASH_CACHE_SIZE = 256
+_logo_hashes = OrderedDict()
+_logo_lock = threading.Lock()
+
+def _logo_hash(logo_base64) -> str:
+    if not logo_base64:
+        return ""
+    # Logos are large; hash each distinct one once rather than on every key
+    with _logo_lock:
+        h = _logo_hashes.get(logo_base64)
+        if h is not None:
+            _logo_hashes.move_to_end(logo_base64)
+            return h
+    h = hashlib.sha256(logo_base64.encode()).hexdigest()
+    with _logo_lock:
+        _logo_hashes[logo_base64] = h
+        while len(_logo_hashes) > LOGO_HASH_CACHE_SIZE:
+            _logo_hashes.popitem(last=False)
+    return h
+
+# Everything the HTML templates and generate_pdf read from an invoice dict
+# (the template name is keyed separately). Bookkeeping such as the settings
+# revision, invoice_counter or updated_at is left out, so saving one invoice
+# doesn't change the key of every other invoice of that user. Add a field
+# here whenever a renderer starts reading it.
+RENDER_FIELDS = (
+    "invoice_number", "client_name", "client_address", "issue_date", "due_date",
+    "items", "subtotal", "cgst_amount", "sgst_amount", "grand_total",
+    "gst_enabled", "cgst_percent", "sgst_percent", "terms_conditions",
+    "company_name", "invoice_title", "phone_number", "website", "email",
+    "custom_columns", "invoice_template", "logo_hash",
+)
+
+def render_key(invoice_data: dict, template_name: str, kind: str) -> str:
+    """Stable hash of everything that affects a rendered invoice.
+
+    Covers the RENDER_FIELDS of the invoice and its merged settings, the
+    template and the logo, which is hashed separately instead of being
+    serialised into the key material.
+    """
+    fields = {k: invoice_data.get(k) for k in RENDER_FIELDS}
+    material = json.dumps(
+        {
+            "v": RENDER_CACHE_VERSION,
+            "kind": kind,
+            "template": template_name,
+            "logo": _logo_hash(invoice_data.get("company_logo_base64")),
+            "data": fields,
+        },
+        sort_keys=True, default=str, separators=(",", ":"),
+    )
+    return hashlib.sha256(material.encode()).hexdigest()
+
+class RenderCache:
+    """Two-tier cache of rendered output: an LRU in memory bounded by total
+    bytes, backed by files under a directory that survive restarts and are
+    bounded the same way."""
+
+    def __init__(self, directory: str = RENDER_CACHE_DIR, max_bytes: int = RENDER_CACHE_MEMORY_BYTES,
+                 disk_bytes: int = RENDER_CACHE_DISK_BYTES, max_age: int = RENDER_CACHE_MAX_AGE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.disk_bytes = disk_bytes
+        self.max_age = max_age
+        self._entries = OrderedDict()
+        self._size = 0
+        # path -> size of the files on disk, least recently used first; built
+        # from the directory on first use
+        self._files = None
+        self._disk_size = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str, ext: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.{ext}")
+
+    def _disk_index(self) -> OrderedDict:
+        """The LRU index of the files on disk (caller holds the lock)."""
+        if self._files is None:
+            found, cutoff = [], time.time() - self.max_age
+            try:
+                os.makedirs(self.directory, mode=0o700, exist_ok=True)
+                for root, _, names in os.walk(self.directory):
+                    for name in names:
+                        path = os.path.join(root, name)
+                        try:
+                            st = os.stat(path)
+                            if st.st_mtime < cutoff:
+                                os.remove(path)
+                            else:
+                                found.append((st.st_mtime, path, st.st_size))
+                        except OSError:
+                            pass
+            except OSError:
+                pass
+            self._files = OrderedDict((path, size) for _, path, size in sorted(found))
+            self._disk_size = sum(self._files.values())
+        return self._files
+
+    def _touch(self, path: str):
+        with self._lock:
+            files = self._disk_index()
+            if path in files:
+                files.move_to_end(path)
+        try:
+            # Recency survives a restart through the mtime
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _track(self, path: str, size: int):
+        """Record a written file and evict the least recently used ones beyond disk_bytes."""
+        evicted = []
+        with self._lock:
+            files = self._disk_index()
+            self._disk_size += size - files.pop(path, 0)
+            files[path] = size
+            while self._disk_size > self.disk_bytes and len(files) > 1:
+                old, old_size = files.popitem(last=False)
+                self._disk_size -= old_size
+                evicted.append(old)
+        for old in evicted:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    def get(self, key: str, ext: str):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                return data
+        path = self._path(key, ext)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        self._touch(path)
+        self._remember(key, data)
+        return data
+
+    def put(self, key: str, ext: str, data: bytes, memory: bool = True) -> bool:
+        """Cache data under key; returns False if it could not be written to disk."""
+        path = self._path(key, ext)
+        stored = False
+        try:
+            os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            except OSError:
+                os.remove(tmp)
+                raise
+            stored = True
+        except OSError:
+            pass
+        if stored:
+            self._track(path, len(data))
+        if memory:
+            self._remember(key, data)
+        return stored
+
+    def _remember(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+render_cache = RenderCache()
+
+def cached_render_invoice(template_name: str, data: dict) -> str:
+    key = render_key(data, template_name, "html")
+    html = render_cache.get(key, "html")
+    if html is None:
+        html = render_invoice(template_name, data).encode()
+        render_cache.put(key, "html", html)
+    return html.decode()
+
+def cached_generate_pdf(data: dict) -> bytes:
+    key = render_key(data, data.get("invoice_template", "classic"), "pdf")
+    pdf = render_cache.get(key, "pdf")
+    if pdf is None:
+        pdf = generate_pdf(data)
+        render_cache.put(key, "pdf", pdf)
+    return pdf
\ No newline at end of file
@@ -0,0 +1,141 @@
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from utils.pdf_generator import generate_pdf
+from utils.render_cache import render_cache, render_key
+
+# PDF renders run in a small process pool shared by every session, so a
+# ReportLab render never blocks a script thread and a burst of clicks can only
+# ever occupy this many cores. Finished PDFs go to the render cache's disk
+# tier, which is the result store: a job id is the PDF's render key, so the
+# same invoice revision is only ever rendered once.
+RENDER_WORKERS = int(os.environ.get("INVOICEPRO_RENDER_WORKERS", "2"))
+# Finished jobs remembered for status polling; their PDFs stay in the cache
+RENDER_JOB_HISTORY = 1000
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+class _Job:
+    __slots__ = ("future", "error", "submitted", "seconds")
+
+    def __init__(self, future=None):
+        self.future = future
+        self.error = None
+        self.submitted = time.perf_counter()
+        self.seconds = 0.0 if future is None else None
+
+class RenderQueue:
+    """Background PDF renders: submit() returns a job id at once, status()
+    and result() are polled by the page that is waiting for it."""
+
+    def __init__(self, workers: int = RENDER_WORKERS, history: int = RENDER_JOB_HISTORY):
+        self.workers = workers
+        self.history = history
+        self._jobs = OrderedDict()
+        self._pool = None
+        # Reentrant: a future that is already done runs its callback (_finish)
+        # inside add_done_callback, while submit() still holds the lock
+        self._lock = threading.RLock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn rather than fork: the Streamlit server process is multi-threaded
+            self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def submit(self, invoice_data: dict) -> str:
+        """Queue a PDF render of an effective invoice (settings merged in); returns its job id.
+
+        Submitting an invoice revision that is already queued, running or
+        rendered returns the same job id without rendering it again; a failed
+        job is retried.
+        """
+        key = render_key(invoice_data, invoice_data.get("invoice_template", "classic"), "pdf")
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and self._state(job) in (QUEUED, RUNNING):
+                self._jobs.move_to_end(key)
+                return key
+            if render_cache.get(key, "pdf") is not None:
+                job = _Job()
+            else:
+                try:
+                    pool = self._executor()
+                    future = pool.submit(generate_pdf, invoice_data)
+                except BrokenProcessPool:
+                    # A worker died (e.g. killed for memory); start a fresh pool
+                    self._pool = None
+                    pool = self._executor()
+                    future = pool.submit(generate_pdf, invoice_data)
+                job = _Job(future)
+                future.add_done_callback(lambda f, key=key, job=job, pool=pool: self._finish(key, job, f, pool))
+            self._jobs[key] = job
+            self._trim()
+        return key
+
+    def _finish(self, key: str, job: _Job, future, pool):
+        error = None
+        try:
+            if not render_cache.put(key, "pdf", future.result()):
+                # The cache's disk tier is the result store; without it the PDF is lost
+                error = "The rendered PDF could not be stored"
+        except BrokenProcessPool:
+            # Every job in flight on the pool fails with this; the next submit
+            # gets a fresh pool rather than discovering the broken one
+            error = "The PDF renderer stopped unexpectedly; try again"
+            with self._lock:
+                if self._pool is pool:
+                    self._pool = None
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        with self._lock:
+            job.error = error
+            job.seconds = time.perf_counter() - job.submitted
+
+    def _state(self, job: _Job) -> str:
+        if job.error is not None:
+            return FAILED
+        if job.seconds is not None:
+            return DONE
+        return RUNNING if job.future.running() else QUEUED
+
+    def _trim(self):
+        # Drop the oldest finished jobs; unfinished ones are never forgotten
+        excess = len(self._jobs) - self.history
+        for key in list(self._jobs):
+            if excess <= 0:
+                break
+            if self._jobs[key].seconds is not None:
+                del self._jobs[key]
+                excess -= 1
+
+    def status(self, job_id: str) -> dict:
+        """{"status": queued|running|done|failed, "error", "seconds"} for a job id.
+
+        An id this process has no job for is done if its PDF is in the
+        render cache (rendered before a restart) and failed otherwise.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return {"status": self._state(job), "error": job.error, "seconds": job.seconds}
+        if render_cache.get(job_id, "pdf") is not None:
+            return {"status": DONE, "error": None, "seconds": 0.0}
+        return {"status": FAILED, "error": "Unknown render job", "seconds": None}
+
+    def result(self, job_id: str):
+        """The rendered PDF's bytes, or None until the job is done."""
+        return render_cache.get(job_id, "pdf")
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+render_queue = RenderQueue()
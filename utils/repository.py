@@ -0,0 +1,387 @@
+import base64
+import json
+import logging
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from utils.concurrency import gather
+
+log = logging.getLogger(__name__)
+
+# How stale the trigger-maintained platform_stats rollup may get before it is recomputed
+STATS_RECONCILE_INTERVAL = timedelta(hours=1)
+
+class DuplicateError(Exception):
+    """Raised when an insert collides with a unique key (e.g. a repeated signup email)."""
+
+class Repository(ABC):
+    """The storage operations the app uses, independent of the backend.
+
+    utils/db wraps these with caching and app-level policy; views never talk to
+    a backend directly. Rows come back as plain dicts with the column names of
+    the Supabase schema, whichever backend served them.
+    """
+
+    # ── PROFILES ──
+    @abstractmethod
+    def get_profile(self, user_id: str, columns: str = "*"):
+        """The profile with id user_id, or None."""
+
+    @abstractmethod
+    def get_profile_by_email(self, email: str):
+        """The profile with this email, or None."""
+
+    @abstractmethod
+    def list_profiles(self) -> list:
+        """All profiles, newest first."""
+
+    @abstractmethod
+    def create_profile(self, profile: dict) -> dict:
+        """Insert a profile and return it, id included."""
+
+    @abstractmethod
+    def update_profile(self, user_id: str, changes: dict):
+        """Apply changes to the profile with id user_id."""
+
+    # ── SIGNUP REQUESTS ──
+    @abstractmethod
+    def list_signup_requests(self) -> list:
+        """All signup requests, newest first."""
+
+    @abstractmethod
+    def get_signup_request(self, email: str, columns: str = "*"):
+        """The signup request for this email, or None."""
+
+    @abstractmethod
+    def create_signup_request(self, request: dict):
+        """Insert a signup request; raises DuplicateError if the email already has one."""
+
+    @abstractmethod
+    def update_signup_request(self, request_id: str, changes: dict):
+        """Apply changes to the signup request with id request_id."""
+
+    # ── USER SETTINGS ──
+    @abstractmethod
+    def get_settings(self, user_id: str, columns: str = "*"):
+        """The user's settings row, or None."""
+
+    @abstractmethod
+    def get_settings_revision(self, user_id: str):
+        """The revision of the user's settings row, or None."""
+
+    @abstractmethod
+    def insert_settings(self, settings: dict):
+        """Insert a settings row; columns left out take their defaults."""
+
+    @abstractmethod
+    def upsert_settings(self, settings: dict):
+        """Insert or update the settings row of settings["user_id"]; the revision is bumped."""
+
+    @abstractmethod
+    def update_settings(self, user_id: str, changes: dict):
+        """Apply changes to the user's settings row; the revision is bumped."""
+
+    @abstractmethod
+    def allocate_invoice_numbers(self, user_id: str, count: int = 1) -> int:
+        """Atomically advance the invoice counter by count and return the first reserved value."""
+
+    # ── INVOICES ──
+    @abstractmethod
+    def insert_invoice(self, invoice: dict):
+        """Insert one invoice as given, leaving the counter alone."""
+
+    @abstractmethod
+    def insert_invoices(self, rows: list, min_counter: int = None):
+        """Insert many invoices with the same keys in as few statements as possible.
+
+        With min_counter, the owner's invoice counter (all rows share one owner)
+        is raised to at least that value in the same transaction, so numbers
+        kept from an import are never handed out again. Raises DuplicateError
+        if any invoice number is already taken; nothing is inserted then.
+        """
+
+    @abstractmethod
+    def create_invoice(self, invoice: dict, counter: int = None) -> dict:
+        """Insert an invoice and advance the counter in one transaction.
+
+        Returns {"invoice_id", "invoice_number", "settings_revision"}. Raises
+        DuplicateError if the invoice number is already taken; nothing changes then.
+        """
+
+    @abstractmethod
+    def get_invoice(self, invoice_id: str):
+        """The invoice with id invoice_id, or None."""
+
+    @abstractmethod
+    def update_invoice(self, invoice_id: str, changes: dict):
+        """Apply changes to the invoice with id invoice_id."""
+
+    @abstractmethod
+    def list_invoices(self, columns: str, user_id: str = None, status: str = None, search: str = None,
+                      cursor: dict = None, limit: int = None, with_owner: bool = False,
+                      ids: list = None, issued_from: str = None, issued_to: str = None) -> list:
+        """Invoices newest first, ordered by (created_at, id) and starting after cursor.
+
+        with_owner adds a "profiles" dict holding the owner's full_name and company_name.
+        """
+
+    @abstractmethod
+    def search_invoices(self, query: str, columns: str, user_id: str = None,
+                        status: str = None, limit: int = 50, with_owner: bool = False, offset: int = 0) -> list:
+        """Invoices whose number, client name or client email match query, best match first.
+
+        Every word of query matches as a prefix. The first offset matches are
+        skipped. with_owner as for list_invoices.
+        """
+
+    @abstractmethod
+    def find_invoices_by_serial(self, serial: str, columns: str, user_id: str = None, limit: int = 200) -> list:
+        """Invoices with a line item whose serial_no is exactly serial, newest first."""
+
+    @abstractmethod
+    def revenue_by_description(self, user_id: str = None, status: str = None, issued_from: str = None,
+                               issued_to: str = None, limit: int = 50) -> list:
+        """Rows of {"description", "invoice_count", "quantity", "revenue"} over line items,
+        highest revenue first."""
+
+    @abstractmethod
+    def invoice_status_totals(self) -> list:
+        """Rows of {"invoice_status", "invoice_count", "revenue"}."""
+
+    @abstractmethod
+    def platform_stats(self) -> dict:
+        """{"total_users", "total_invoices", "pending_requests"}."""
+
+    # ── LOGO ASSETS ──
+    @abstractmethod
+    def has_logo_asset(self, logo_hash: str) -> bool:
+        """Whether variants are stored under logo_hash."""
+
+    @abstractmethod
+    def insert_logo_assets(self, rows: list, original: bytes):
+        """Insert logo variant rows made from the uploaded image original,
+        ignoring any that already exist. Shared backends key them by the hash
+        of original computed server-side, whatever hash the rows carry."""
+
+    @abstractmethod
+    def get_logo_assets(self, logo_hash: str) -> list:
+        """The variant rows stored under logo_hash."""
+
+def _quote(value) -> str:
+    """Quote a value for use inside a PostgREST or=(...) filter."""
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+def _stats_stale(row) -> bool:
+    """Whether the rollup row is older than STATS_RECONCILE_INTERVAL (or its age can't be read)."""
+    try:
+        return datetime.now(timezone.utc) - datetime.fromisoformat(row["reconciled_at"]) > STATS_RECONCILE_INTERVAL
+    except (ValueError, TypeError):
+        log.warning("Unreadable platform_stats reconciled_at %r; reconciling", row.get("reconciled_at"))
+        return True
+
+class SupabaseRepository(Repository):
+    """Repository over a supabase-py client (PostgREST plus the RPCs in sql/)."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def table(self, name: str):
+        return self.client.table(name)
+
+    # ── PROFILES ──
+    def get_profile(self, user_id, columns="*"):
+        return self.table("profiles").select(columns).eq("id", user_id).single().execute().data
+
+    def get_profile_by_email(self, email):
+        return self.table("profiles").select("*").eq("email", email).single().execute().data
+
+    def list_profiles(self):
+        return self.table("profiles").select("*").order("created_at", desc=True).execute().data or []
+
+    def create_profile(self, profile):
+        return self.table("profiles").insert(profile).execute().data[0]
+
+    def update_profile(self, user_id, changes):
+        self.table("profiles").update(changes).eq("id", user_id).execute()
+
+    # ── SIGNUP REQUESTS ──
+    def list_signup_requests(self):
+        return self.table("signup_requests").select("*").order("created_at", desc=True).execute().data or []
+
+    def get_signup_request(self, email, columns="*"):
+        return self.table("signup_requests").select(columns).eq("email", email).single().execute().data
+
+    def create_signup_request(self, request):
+        try:
+            self.table("signup_requests").insert(request).execute()
+        except Exception as e:
+            if "duplicate" in str(e).lower():
+                raise DuplicateError(str(e)) from e
+            raise
+
+    def update_signup_request(self, request_id, changes):
+        self.table("signup_requests").update(changes).eq("id", request_id).execute()
+
+    # ── USER SETTINGS ──
+    def get_settings(self, user_id, columns="*"):
+        return self.table("user_settings").select(columns).eq("user_id", user_id).single().execute().data
+
+    def get_settings_revision(self, user_id):
+        row = self.table("user_settings").select("revision").eq("user_id", user_id).single().execute().data
+        return row.get("revision") if row else None
+
+    def insert_settings(self, settings):
+        self.table("user_settings").insert(settings).execute()
+
+    def upsert_settings(self, settings):
+        self.table("user_settings").upsert(settings, on_conflict="user_id").execute()
+
+    def update_settings(self, user_id, changes):
+        self.table("user_settings").update(changes).eq("user_id", user_id).execute()
+
+    def allocate_invoice_numbers(self, user_id, count=1):
+        rows = self.client.rpc(
+            "allocate_invoice_numbers", {"p_user_id": user_id, "p_count": count}
+        ).execute().data
+        if not rows:
+            raise RuntimeError(f"No settings row for user {user_id}")
+        return int(rows[0]["first_number"])
+
+    # ── INVOICES ──
+    def insert_invoice(self, invoice):
+        return self.table("invoices").insert(invoice).execute()
+
+    def insert_invoices(self, rows, min_counter=None):
+        try:
+            if min_counter is None:
+                # PostgREST turns a list body into one multi-row insert
+                self.table("invoices").insert(rows).execute()
+            else:
+                self.client.rpc("insert_invoices", {"p_rows": rows, "p_min_counter": min_counter}).execute()
+        except Exception as e:
+            if "duplicate" in str(e).lower():
+                raise DuplicateError(str(e)) from e
+            raise
+
+    def create_invoice(self, invoice, counter=None):
+        try:
+            return self.client.rpc(
+                "create_invoice", {"p_invoice": invoice, "p_counter": counter}
+            ).execute().data[0]
+        except Exception as e:
+            if "duplicate" in str(e).lower():
+                raise DuplicateError(str(e)) from e
+            raise
+
+    def get_invoice(self, invoice_id):
+        return self.table("invoices").select("*").eq("id", invoice_id).single().execute().data
+
+    def update_invoice(self, invoice_id, changes):
+        self.table("invoices").update(changes).eq("id", invoice_id).execute()
+
+    def list_invoices(self, columns, user_id=None, status=None, search=None, cursor=None, limit=None,
+                      with_owner=False, ids=None, issued_from=None, issued_to=None):
+        if with_owner:
+            columns = f"{columns}, profiles(full_name, company_name)"
+        q = self.table("invoices").select(columns)
+        if user_id:
+            q = q.eq("user_id", user_id)
+        if status:
+            q = q.eq("invoice_status", status)
+        if ids:
+            q = q.in_("id", ids)
+        if issued_from:
+            q = q.gte("issue_date", issued_from)
+        if issued_to:
+            q = q.lte("issue_date", issued_to)
+        if search:
+            pattern = _quote(f"*{search}*")
+            q = q.or_(f"client_name.ilike.{pattern},invoice_number.ilike.{pattern}")
+        if cursor:
+            ts, last_id = _quote(cursor["created_at"]), _quote(cursor["id"])
+            q = q.or_(f"created_at.lt.{ts},and(created_at.eq.{ts},id.lt.{last_id})")
+        q = q.order("created_at", desc=True).order("id", desc=True)
+        if limit:
+            q = q.limit(limit)
+        return q.execute().data or []
+
+    def search_invoices(self, query, columns, user_id=None, status=None, limit=50, with_owner=False, offset=0):
+        if with_owner:
+            columns = f"{columns}, profiles(full_name, company_name)"
+        return self.client.rpc("search_invoices", {
+            "p_query": query, "p_user_id": user_id, "p_status": status, "p_limit": limit, "p_offset": offset,
+        }).select(columns).execute().data or []
+
+    def find_invoices_by_serial(self, serial, columns, user_id=None, limit=200):
+        # Containment on the jsonb items, served by their GIN index (sql/009)
+        q = self.table("invoices").select(columns).filter("items", "cs", json.dumps([{"serial_no": serial}]))
+        if user_id:
+            q = q.eq("user_id", user_id)
+        return q.order("created_at", desc=True).order("id", desc=True).limit(limit).execute().data or []
+
+    def revenue_by_description(self, user_id=None, status=None, issued_from=None, issued_to=None, limit=50):
+        return self.client.rpc("revenue_by_description", {
+            "p_user_id": user_id, "p_status": status, "p_from": issued_from, "p_to": issued_to, "p_limit": limit,
+        }).execute().data or []
+
+    def invoice_status_totals(self):
+        return self.table("invoice_status_totals").select("*").execute().data or []
+
+    def _count(self, table: str, **filters) -> int:
+        q = self.table(table).select("id", count="exact", head=True)
+        for col, val in filters.items():
+            q = q.eq(col, val)
+        return q.execute().count or 0
+
+    def platform_stats(self):
+        """Read the platform_stats rollup (sql/003), reconciling it when it is stale.
+
+        Falls back to exact counts if the rollup is unavailable.
+        """
+        try:
+            rows = self.table("platform_stats_totals").select("*").execute().data
+            row = rows[0] if rows else None
+            if row is None or _stats_stale(row):
+                row = self.client.rpc("reconcile_platform_stats").execute().data
+            if isinstance(row, list):
+                row = row[0]
+            return {k: int(row[k]) for k in ("total_users", "total_invoices", "pending_requests")}
+        except Exception:
+            log.exception("platform_stats rollup unavailable; counting exactly")
+            users, invoices, pending = gather(
+                lambda: self._count("profiles"),
+                lambda: self._count("invoices"),
+                lambda: self._count("signup_requests", status="pending"),
+            )
+            return {"total_users": users, "total_invoices": invoices, "pending_requests": pending}
+
+    # ── LOGO ASSETS ──
+    def has_logo_asset(self, logo_hash):
+        return bool(self.table("logo_assets").select("hash").eq("hash", logo_hash).limit(1).execute().data)
+
+    def insert_logo_assets(self, rows, original):
+        # logo_assets is read-only to clients (sql/004); store_logo_asset hashes original itself
+        self.client.rpc("store_logo_asset", {
+            "p_original": base64.b64encode(original).decode(),
+            "p_variants": [{k: v for k, v in r.items() if k != "hash"} for r in rows],
+        }).execute()
+
+    def get_logo_assets(self, logo_hash):
+        return self.table("logo_assets").select("variant,data_base64").eq("hash", logo_hash).execute().data or []
+
+def open_backend(backend: str = None, **options) -> Repository:
+    """Open the storage backend named by backend or $INVOICEPRO_BACKEND.
+
+    "supabase" (the default) takes url/key options or $SUPABASE_URL/$SUPABASE_KEY;
+    "sqlite" takes a path option or $INVOICEPRO_SQLITE_PATH.
+    """
+    backend = backend or os.environ.get("INVOICEPRO_BACKEND", "supabase")
+    if backend == "sqlite":
+        from utils.sqlite_repository import SQLiteRepository
+        return SQLiteRepository(options.get("path") or os.environ.get("INVOICEPRO_SQLITE_PATH", "invoicepro.db"))
+    if backend == "supabase":
+        from supabase import create_client
+        url = options.get("url") or os.environ.get("SUPABASE_URL", "")
+        key = options.get("key") or os.environ.get("SUPABASE_KEY", "")
+        return SupabaseRepository(create_client(url, key))
+    raise ValueError(f"Unknown storage backend: {backend}")
@@ -0,0 +1,613 @@
+import json
+import re
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from utils.repository import Repository, DuplicateError
+
+# Mirrors the Supabase tables (and the sql/ migrations) closely enough that rows
+# look the same to the rest of the app. Defaults match utils/db.DEFAULT_SETTINGS.
+SCHEMA = """
+create table if not exists profiles (
+    id                text primary key,
+    email             text not null unique,
+    full_name         text,
+    company_name      text,
+    phone             text,
+    role              text not null default 'user',
+    status            text not null default 'pending',
+    access_type       text default 'permanent',
+    access_months     integer,
+    access_start_date text,
+    access_end_date   text,
+    created_at        text not null
+);
+create index if not exists profiles_created_idx on profiles (created_at desc);
+
+create table if not exists signup_requests (
+    id           text primary key,
+    email        text not null unique,
+    full_name    text,
+    company_name text,
+    phone        text,
+    raw_password text,
+    status       text not null default 'pending',
+    reviewed_by  text,
+    reviewed_at  text,
+    created_at   text not null
+);
+create index if not exists signup_requests_status_idx on signup_requests (status, created_at desc);
+
+create table if not exists user_settings (
+    user_id             text primary key references profiles (id) on delete cascade,
+    company_name        text default 'Your Company Name',
+    invoice_title       text default 'INVOICE',
+    invoice_prefix      text default 'INV-',
+    phone_number        text default '',
+    website             text default '',
+    email               text default '',
+    logo_hash           text,
+    company_logo_base64 text,
+    gst_enabled         integer default 0,
+    cgst_percent        real default 9.0,
+    sgst_percent        real default 9.0,
+    terms_conditions    text default 'Warranty will be valid only if the bill is present.',
+    invoice_template    text default 'classic',
+    invoice_counter     integer not null default 1,
+    custom_columns      text,
+    revision            integer not null default 0,
+    updated_at          text,
+    legacy_logo_pending integer generated always as (company_logo_base64 is not null and logo_hash is null) virtual
+);
+
+create table if not exists invoices (
+    id               text primary key,
+    user_id          text not null references profiles (id) on delete cascade,
+    invoice_number   text not null,
+    client_name      text,
+    client_address   text,
+    client_email     text,
+    client_phone     text,
+    issue_date       text,
+    due_date         text,
+    items            text,
+    subtotal         real default 0,
+    cgst_amount      real default 0,
+    sgst_amount      real default 0,
+    grand_total      real default 0,
+    gst_enabled      integer default 0,
+    cgst_percent     real,
+    sgst_percent     real,
+    terms_conditions text,
+    template         text default 'classic',
+    invoice_status   text not null default 'draft',
+    created_at       text not null
+);
+create unique index if not exists invoices_user_number_key on invoices (user_id, invoice_number);
+create index if not exists invoices_user_created_idx on invoices (user_id, created_at desc, id desc);
+create index if not exists invoices_created_idx on invoices (created_at desc, id desc);
+create index if not exists invoices_status_created_idx on invoices (invoice_status, created_at desc, id desc);
+create index if not exists invoices_status_total_idx on invoices (invoice_status, grand_total);
+
+-- Full-text index for search_invoices, kept in sync by triggers. The prefix
+-- indexes make 2- and 3-character prefix queries as cheap as whole words.
+create virtual table if not exists invoices_fts using fts5(
+    invoice_number, client_name, client_email,
+    content = 'invoices', content_rowid = 'rowid', tokenize = 'unicode61', prefix = '2 3'
+);
+create trigger if not exists invoices_fts_insert after insert on invoices begin
+    insert into invoices_fts (rowid, invoice_number, client_name, client_email)
+    values (new.rowid, new.invoice_number, new.client_name, new.client_email);
+end;
+create trigger if not exists invoices_fts_delete after delete on invoices begin
+    insert into invoices_fts (invoices_fts, rowid, invoice_number, client_name, client_email)
+    values ('delete', old.rowid, old.invoice_number, old.client_name, old.client_email);
+end;
+create trigger if not exists invoices_fts_update after update of invoice_number, client_name, client_email on invoices begin
+    insert into invoices_fts (invoices_fts, rowid, invoice_number, client_name, client_email)
+    values ('delete', old.rowid, old.invoice_number, old.client_name, old.client_email);
+    insert into invoices_fts (rowid, invoice_number, client_name, client_email)
+    values (new.rowid, new.invoice_number, new.client_name, new.client_email);
+end;
+
+-- Line items normalized out of invoices.items for item-level queries (serial
+-- lookups, revenue per description). Triggers keep it in step with the items
+-- JSON, which stays the source of truth and keeps any custom columns. amount
+-- is the stored line amount (utils/pricing); items saved before amounts were
+-- stored get quantity * unit_price rounded to the paisa.
+create table if not exists invoice_items (
+    invoice_id  text not null references invoices (id) on delete cascade,
+    position    integer not null,
+    description text,
+    serial_no   text,
+    quantity    real,
+    unit_price  real,
+    amount      real,
+    primary key (invoice_id, position)
+) without rowid;
+create index if not exists invoice_items_serial_idx on invoice_items (serial_no);
+-- Covers revenue_by_description, so the grouping never touches the table
+create index if not exists invoice_items_amount_idx
+    on invoice_items (description, invoice_id, quantity, amount);
+create trigger if not exists invoice_items_insert after insert on invoices begin
+    insert into invoice_items (invoice_id, position, description, serial_no, quantity, unit_price, amount)
+    select new.id, key, json_extract(value, '$.description'), json_extract(value, '$.serial_no'),
+           cast(json_extract(value, '$.quantity') as real), cast(json_extract(value, '$.unit_price') as real),
+           coalesce(cast(json_extract(value, '$.amount') as real),
+                    round(cast(json_extract(value, '$.quantity') as real) * cast(json_extract(value, '$.unit_price') as real), 2))
+      from json_each(case when json_valid(new.items) then new.items else '[]' end);
+end;
+create trigger if not exists invoice_items_update after update of items on invoices begin
+    delete from invoice_items where invoice_id = old.id;
+    insert into invoice_items (invoice_id, position, description, serial_no, quantity, unit_price, amount)
+    select new.id, key, json_extract(value, '$.description'), json_extract(value, '$.serial_no'),
+           cast(json_extract(value, '$.quantity') as real), cast(json_extract(value, '$.unit_price') as real),
+           coalesce(cast(json_extract(value, '$.amount') as real),
+                    round(cast(json_extract(value, '$.quantity') as real) * cast(json_extract(value, '$.unit_price') as real), 2))
+      from json_each(case when json_valid(new.items) then new.items else '[]' end);
+end;
+
+create table if not exists logo_assets (
+    hash        text not null,
+    variant     text not null,
+    mime        text not null,
+    width       integer not null,
+    height      integer not null,
+    data_base64 text not null,
+    primary key (hash, variant)
+);
+"""
+
+_BOOL_COLUMNS = ("gst_enabled", "legacy_logo_pending")
+_JSON_COLUMNS = ("items", "custom_columns")
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def _new_id() -> str:
+    return str(uuid.uuid4())
+
+def _row(row):
+    if row is None:
+        return None
+    d = dict(row)
+    for col in _BOOL_COLUMNS:
+        if d.get(col) is not None:
+            d[col] = bool(d[col])
+    for col in _JSON_COLUMNS:
+        if isinstance(d.get(col), str):
+            d[col] = json.loads(d[col])
+    return d
+
+def _encode(values: dict) -> dict:
+    """JSON-encode list/dict values (custom_columns, items) for TEXT columns."""
+    return {k: json.dumps(v) if isinstance(v, (list, dict)) else v for k, v in values.items()}
+
+def _attach_owner(rows: list):
+    """Fold the joined owner columns into a "profiles" dict, the shape PostgREST embeds."""
+    for r in rows:
+        r["profiles"] = {"full_name": r.pop("owner_full_name"), "company_name": r.pop("owner_company_name")}
+
+def _fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query matching every word as a prefix."""
+    return " ".join(f'"{w}"*' for w in re.findall(r"\w+", text.lower()))
+
+def _format_number(prefix: str, counter: int) -> str:
+    # Same format as utils/db.format_invoice_number and create_invoice (sql/007)
+    return f"{prefix or ''}{counter:04d}"
+
+class SQLiteRepository(Repository):
+    """Repository over an embedded SQLite database, for single-tenant installs,
+    offline use and benchmarking.
+
+    Every thread gets its own connection (WAL mode, so readers never block the
+    writer); multi-statement writes run in BEGIN IMMEDIATE transactions.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._columns = {}
+        conn = self._conn()
+        had_fts = conn.execute("select 1 from sqlite_master where name = 'invoices_fts'").fetchone()
+        had_items = conn.execute("select 1 from sqlite_master where name = 'invoice_items'").fetchone()
+        if had_items and "amount" not in {r[1] for r in conn.execute("pragma table_info(invoice_items)")}:
+            # Predates stored line amounts: rebuild it (and its triggers) from the items below
+            conn.executescript(
+                "drop trigger invoice_items_insert; drop trigger invoice_items_update; drop table invoice_items;"
+            )
+            had_items = None
+        conn.executescript(SCHEMA)
+        if not had_fts:
+            # Index invoices written before the search index existed
+            conn.execute("insert into invoices_fts (invoices_fts) values ('rebuild')")
+        if not had_items:
+            # Unwrap items saved as a JSON string of JSON (json.dumps of json.dumps);
+            # the update trigger fills invoice_items for those rows, the insert below the rest
+            with self._transaction() as tx:
+                tx.execute(
+                    "update invoices set items = json_extract(items, '$') "
+                    "where json_valid(items) and json_type(items) = 'text'"
+                )
+                tx.execute(
+                    "insert or ignore into invoice_items "
+                    "(invoice_id, position, description, serial_no, quantity, unit_price, amount) "
+                    "select i.id, j.key, json_extract(j.value, '$.description'), json_extract(j.value, '$.serial_no'), "
+                    "cast(json_extract(j.value, '$.quantity') as real), cast(json_extract(j.value, '$.unit_price') as real), "
+                    "coalesce(cast(json_extract(j.value, '$.amount') as real), round(cast(json_extract(j.value, '$.quantity') "
+                    "as real) * cast(json_extract(j.value, '$.unit_price') as real), 2)) "
+                    "from invoices i, json_each(case when json_valid(i.items) then i.items else '[]' end) j"
+                )
+        for table in ("profiles", "signup_requests", "user_settings", "invoices", "logo_assets"):
+            self._columns[table] = {r[1] for r in conn.execute(f"pragma table_xinfo({table})")}
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("pragma journal_mode = wal")
+            conn.execute("pragma synchronous = normal")
+            conn.execute("pragma foreign_keys = on")
+            conn.execute("pragma busy_timeout = 5000")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute("begin immediate")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("rollback")
+            raise
+        conn.execute("commit")
+
+    def _select_list(self, table: str, columns: str, alias: str = None) -> str:
+        """Validate a PostgREST-style column list against the table and turn it into SQL."""
+        prefix = f"{alias}." if alias else ""
+        if columns.strip() == "*":
+            return f"{prefix}*"
+        names = [c.strip() for c in columns.split(",") if c.strip()]
+        self._check_columns(table, names)
+        return ", ".join(prefix + c for c in names)
+
+    def _check_columns(self, table: str, names):
+        unknown = [c for c in names if c not in self._columns[table]]
+        if unknown:
+            raise ValueError(f"Unknown {table} columns: {', '.join(unknown)}")
+
+    def _insert(self, conn, table: str, values: dict, or_ignore: bool = False):
+        self._check_columns(table, values)
+        values = _encode(values)
+        cols = ", ".join(values)
+        marks = ", ".join("?" * len(values))
+        verb = "insert or ignore" if or_ignore else "insert"
+        conn.execute(f"{verb} into {table} ({cols}) values ({marks})", list(values.values()))
+
+    def _update(self, table: str, key: str, key_value, changes: dict, extra: str = ""):
+        self._check_columns(table, changes)
+        changes = _encode(changes)
+        assignments = ", ".join(f"{c} = ?" for c in changes)
+        if extra:
+            assignments = f"{assignments}, {extra}" if assignments else extra
+        self._conn().execute(
+            f"update {table} set {assignments} where {key} = ?", [*changes.values(), key_value]
+        )
+
+    def _one(self, sql: str, params=()):
+        return _row(self._conn().execute(sql, params).fetchone())
+
+    def _all(self, sql: str, params=()) -> list:
+        return [_row(r) for r in self._conn().execute(sql, params).fetchall()]
+
+    # ── PROFILES ──
+    def get_profile(self, user_id, columns="*"):
+        return self._one(f"select {self._select_list('profiles', columns)} from profiles where id = ?", (user_id,))
+
+    def get_profile_by_email(self, email):
+        return self._one("select * from profiles where email = ?", (email,))
+
+    def list_profiles(self):
+        return self._all("select * from profiles order by created_at desc")
+
+    def create_profile(self, profile):
+        profile = {"id": _new_id(), "created_at": _now(), **profile}
+        try:
+            self._insert(self._conn(), "profiles", profile)
+        except sqlite3.IntegrityError as e:
+            raise DuplicateError(str(e)) from e
+        return self.get_profile(profile["id"])
+
+    def update_profile(self, user_id, changes):
+        self._update("profiles", "id", user_id, changes)
+
+    # ── SIGNUP REQUESTS ──
+    def list_signup_requests(self):
+        return self._all("select * from signup_requests order by created_at desc")
+
+    def get_signup_request(self, email, columns="*"):
+        return self._one(
+            f"select {self._select_list('signup_requests', columns)} from signup_requests where email = ?", (email,)
+        )
+
+    def create_signup_request(self, request):
+        try:
+            self._insert(self._conn(), "signup_requests", {"id": _new_id(), "created_at": _now(), **request})
+        except sqlite3.IntegrityError as e:
+            raise DuplicateError(str(e)) from e
+
+    def update_signup_request(self, request_id, changes):
+        self._update("signup_requests", "id", request_id, changes)
+
+    # ── USER SETTINGS ──
+    def get_settings(self, user_id, columns="*"):
+        return self._one(
+            f"select {self._select_list('user_settings', columns)} from user_settings where user_id = ?", (user_id,)
+        )
+
+    def get_settings_revision(self, user_id):
+        row = self._conn().execute("select revision from user_settings where user_id = ?", (user_id,)).fetchone()
+        return row[0] if row else None
+
+    def insert_settings(self, settings):
+        self._insert(self._conn(), "user_settings", {**settings, "updated_at": _now()})
+
+    def upsert_settings(self, settings):
+        values = {k: v for k, v in settings.items() if k != "legacy_logo_pending"}
+        values["updated_at"] = _now()
+        self._check_columns("user_settings", values)
+        values = _encode(values)
+        cols = ", ".join(values)
+        marks = ", ".join("?" * len(values))
+        # Same revision bump the sql/005 trigger does on Postgres
+        assignments = ", ".join(f"{c} = excluded.{c}" for c in values if c != "user_id")
+        self._conn().execute(
+            f"insert into user_settings ({cols}) values ({marks}) "
+            f"on conflict (user_id) do update set {assignments}, revision = revision + 1",
+            list(values.values()),
+        )
+
+    def update_settings(self, user_id, changes):
+        self._update("user_settings", "user_id", user_id, {**changes, "updated_at": _now()}, "revision = revision + 1")
+
+    def allocate_invoice_numbers(self, user_id, count=1):
+        if count < 1:
+            raise ValueError("count must be at least 1")
+        with self._transaction() as conn:
+            row = conn.execute(
+                "update user_settings set invoice_counter = invoice_counter + ?, revision = revision + 1, "
+                "updated_at = ? where user_id = ? returning invoice_counter - ?",
+                (count, _now(), user_id, count),
+            ).fetchone()
+        if row is None:
+            raise RuntimeError(f"No settings row for user {user_id}")
+        return int(row[0])
+
+    # ── INVOICES ──
+    def insert_invoice(self, invoice):
+        invoice = {"id": _new_id(), "created_at": _now(), **invoice}
+        self._insert(self._conn(), "invoices", invoice)
+        return invoice
+
+    def insert_invoices(self, rows, min_counter=None):
+        if not rows:
+            return
+        user_id = rows[0]["user_id"]
+        rows = [_encode({"id": _new_id(), "created_at": _now(), **r}) for r in rows]
+        cols = list(rows[0])
+        self._check_columns("invoices", cols)
+        marks = "(" + ", ".join("?" * len(cols)) + ")"
+        # Multi-row statements, each under SQLite's 32766 bound-parameter limit
+        per_statement = 32766 // len(cols)
+        try:
+            with self._transaction() as conn:
+                for i in range(0, len(rows), per_statement):
+                    batch = rows[i:i + per_statement]
+                    conn.execute(
+                        f"insert into invoices ({', '.join(cols)}) values {', '.join([marks] * len(batch))}",
+                        [r[c] for r in batch for c in cols],
+                    )
+                if min_counter is not None:
+                    conn.execute(
+                        "update user_settings set invoice_counter = ?, revision = revision + 1, updated_at = ? "
+                        "where user_id = ? and invoice_counter < ?",
+                        (min_counter, _now(), user_id, min_counter),
+                    )
+        except sqlite3.IntegrityError as e:
+            raise DuplicateError(str(e)) from e
+
+    def create_invoice(self, invoice, counter=None):
+        """Insert an invoice and advance the counter in one transaction, like sql/007."""
+        user_id = invoice["user_id"]
+        try:
+            with self._transaction() as conn:
+                if counter is None:
+                    row = conn.execute(
+                        "update user_settings set invoice_counter = invoice_counter + 1, revision = revision + 1, "
+                        "updated_at = ? where user_id = ? returning invoice_counter - 1, invoice_prefix, revision",
+                        (_now(), user_id),
+                    ).fetchone()
+                else:
+                    row = conn.execute(
+                        "select ?, invoice_prefix, revision from user_settings where user_id = ?", (counter, user_id)
+                    ).fetchone()
+                if row is None:
+                    raise RuntimeError(f"No settings row for user {user_id}")
+                number = _format_number(row[1], row[0])
+                record = {
+                    k: v for k, v in invoice.items() if k in self._columns["invoices"] and k not in ("id", "created_at")
+                }
+                record.update(id=_new_id(), created_at=_now(), invoice_number=number)
+                record.setdefault("invoice_status", "draft")
+                self._insert(conn, "invoices", record)
+        except sqlite3.IntegrityError as e:
+            raise DuplicateError(str(e)) from e
+        return {"invoice_id": record["id"], "invoice_number": number, "settings_revision": row[2]}
+
+    def get_invoice(self, invoice_id):
+        return self._one("select * from invoices where id = ?", (invoice_id,))
+
+    def update_invoice(self, invoice_id, changes):
+        self._update("invoices", "id", invoice_id, changes)
+
+    def list_invoices(self, columns, user_id=None, status=None, search=None, cursor=None, limit=None,
+                      with_owner=False, ids=None, issued_from=None, issued_to=None):
+        select = self._select_list("invoices", columns, "i")
+        join = ""
+        if with_owner:
+            select += ", p.full_name as owner_full_name, p.company_name as owner_company_name"
+            join = " left join profiles p on p.id = i.user_id"
+        where, params = [], []
+        if user_id:
+            where.append("i.user_id = ?")
+            params.append(user_id)
+        if status:
+            where.append("i.invoice_status = ?")
+            params.append(status)
+        if ids:
+            where.append(f"i.id in ({', '.join('?' * len(ids))})")
+            params.extend(ids)
+        if issued_from:
+            where.append("i.issue_date >= ?")
+            params.append(issued_from)
+        if issued_to:
+            where.append("i.issue_date <= ?")
+            params.append(issued_to)
+        if search:
+            pattern = "%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            where.append("(i.client_name like ? escape '\\' or i.invoice_number like ? escape '\\')")
+            params.extend([pattern, pattern])
+        if cursor:
+            where.append("(i.created_at < ? or (i.created_at = ? and i.id < ?))")
+            params.extend([cursor["created_at"], cursor["created_at"], cursor["id"]])
+        sql = f"select {select} from invoices i{join}"
+        if where:
+            sql += " where " + " and ".join(where)
+        sql += " order by i.created_at desc, i.id desc"
+        if limit:
+            sql += " limit ?"
+            params.append(limit)
+        rows = self._all(sql, params)
+        if with_owner:
+            _attach_owner(rows)
+        return rows
+
+    def search_invoices(self, query, columns, user_id=None, status=None, limit=50, with_owner=False, offset=0):
+        match = _fts_query(query)
+        if not match:
+            return []
+        select = self._select_list("invoices", columns, "i")
+        join = ""
+        if with_owner:
+            select += ", p.full_name as owner_full_name, p.company_name as owner_company_name"
+            join = " left join profiles p on p.id = i.user_id"
+        # CROSS JOIN pins the FTS index as the outer loop; the rank column (rather
+        # than calling bm25() in ORDER BY) lets FTS5 score each hit only once.
+        # Invoice numbers weigh most, then client names, then emails.
+        sql = (
+            f"select {select} from invoices_fts "
+            f"cross join invoices i on i.rowid = invoices_fts.rowid{join} "
+            "where invoices_fts match ? and rank match 'bm25(10.0, 5.0, 1.0)'"
+        )
+        params = [match]
+        if user_id:
+            sql += " and i.user_id = ?"
+            params.append(user_id)
+        if status:
+            sql += " and i.invoice_status = ?"
+            params.append(status)
+        sql += " order by invoices_fts.rank limit ? offset ?"
+        params += [limit, offset]
+        rows = self._all(sql, params)
+        if with_owner:
+            _attach_owner(rows)
+        return rows
+
+    def find_invoices_by_serial(self, serial, columns, user_id=None, limit=200):
+        sql = (
+            f"select {self._select_list('invoices', columns, 'i')} from invoices i "
+            "where i.id in (select invoice_id from invoice_items where serial_no = ?)"
+        )
+        params = [serial]
+        if user_id:
+            sql += " and i.user_id = ?"
+            params.append(user_id)
+        sql += " order by i.created_at desc, i.id desc limit ?"
+        params.append(limit)
+        return self._all(sql, params)
+
+    def revenue_by_description(self, user_id=None, status=None, issued_from=None, issued_to=None, limit=50):
+        filters, params = [], []
+        for clause, value in (("i.user_id = ?", user_id), ("i.invoice_status = ?", status),
+                              ("i.issue_date >= ?", issued_from), ("i.issue_date <= ?", issued_to)):
+            if value:
+                filters.append(clause)
+                params.append(value)
+        # Only join the invoices when filtering on them
+        source = f"invoice_items ii join invoices i on i.id = ii.invoice_id where {' and '.join(filters)}" \
+            if filters else "invoice_items ii"
+        params.append(limit)
+        return self._all(
+            "select ii.description, count(distinct ii.invoice_id) as invoice_count, "
+            "total(ii.quantity) as quantity, total(ii.amount) as revenue "
+            f"from {source} group by ii.description order by revenue desc limit ?",
+            params,
+        )
+
+    def invoice_status_totals(self):
+        return self._all(
+            "select invoice_status, count(*) as invoice_count, total(grand_total) as revenue "
+            "from invoices group by invoice_status"
+        )
+
+    def platform_stats(self):
+        # Exact counts are index scans on a local file, so no rollup table is needed
+        row = self._conn().execute(
+            "select (select count(*) from profiles), (select count(*) from invoices), "
+            "(select count(*) from signup_requests where status = 'pending')"
+        ).fetchone()
+        return {"total_users": row[0], "total_invoices": row[1], "pending_requests": row[2]}
+
+    # ── LOGO ASSETS ──
+    def has_logo_asset(self, logo_hash):
+        return self._conn().execute("select 1 from logo_assets where hash = ? limit 1", (logo_hash,)).fetchone() is not None
+
+    def insert_logo_assets(self, rows, original):
+        with self._transaction() as conn:
+            for r in rows:
+                self._insert(conn, "logo_assets", r, or_ignore=True)
+
+    def get_logo_assets(self, logo_hash):
+        return self._all("select variant, data_base64 from logo_assets where hash = ?", (logo_hash,))
+
+def create_superadmin(repo: SQLiteRepository, email: str, full_name: str, password: str) -> dict:
+    """Bootstrap the first Super Admin of a fresh local database."""
+    import bcrypt
+    profile = repo.create_profile({
+        "email": email, "full_name": full_name, "role": "superadmin",
+        "status": "approved", "access_type": "permanent",
+    })
+    repo.insert_settings({"user_id": profile["id"]})
+    # Login checks the password stored with the signup request
+    repo.create_signup_request({
+        "email": email, "full_name": full_name, "status": "approved",
+        "raw_password": bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode(),
+    })
+    return profile
+
+if __name__ == "__main__":
+    import argparse
+    import getpass
+    import os
+
+    parser = argparse.ArgumentParser(description="Create the first Super Admin of a local SQLite database.")
+    parser.add_argument("email")
+    parser.add_argument("full_name")
+    parser.add_argument("--path", default=os.environ.get("INVOICEPRO_SQLITE_PATH", "invoicepro.db"))
+    args = parser.parse_args()
+    create_superadmin(SQLiteRepository(args.path), args.email, args.full_name, getpass.getpass("Password: "))
+    print(f"Created Super Admin {args.email} in {args.path}")
@@ -0,0 +1,28 @@
+import re
+
+_SLOT = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+class CompiledTemplate:
+    """A template split once into static text segments and named {{slot}}s.
+
+    Rendering interleaves the segments with the slot values, so the cost is
+    linear in the output size and nothing is re-parsed per call.
+    """
+    __slots__ = ("segments", "slots", "_fmt")
+
+    def __init__(self, source: str):
+        parts = _SLOT.split(source)
+        self.segments = parts[0::2]
+        self.slots = parts[1::2]
+        # The segments joined into one %-format string, so a render is a single C-level call
+        self._fmt = "%s".join(seg.replace("%", "%%") for seg in self.segments)
+
+    def render(self, ctx: dict) -> str:
+        return self._fmt % tuple([ctx[name] for name in self.slots])
+
+    def render_values(self, values) -> str:
+        """Render from slot values given positionally, in slot order."""
+        return self._fmt % tuple(values)
+
+def compile_template(source: str) -> CompiledTemplate:
+    return CompiledTemplate(source)
@@ -1,21 +1,45 @@
 import streamlit as st
+import pandas as pd
+from utils.db import get_invoice_totals, get_recent_invoices, revenue_by_description, find_invoices_by_serial
+from utils.concurrency import gather
 
-def show_admin_dashboard(supabase):
+def show_admin_dashboard(db):
     st.title("📊 Admin Dashboard")
     try:
-        invoices = supabase.table("invoices").select("*,profiles(full_name)").execute().data or []
-        total_rev = sum(float(i.get("grand_total",0)) for i in invoices)
-        paid = [i for i in invoices if i.get("invoice_status")=="paid"]
-        draft = [i for i in invoices if i.get("invoice_status")=="draft"]
+        totals, recent, top_items = gather(
+            lambda: get_invoice_totals(db),
+            lambda: get_recent_invoices(db, 20),
+            lambda: revenue_by_description(db, limit=10),
+        )
+        total_count = sum(t["count"] for t in totals.values())
+        total_rev = sum(t["revenue"] for t in totals.values())
 
         c1,c2,c3,c4 = st.columns(4)
-        c1.metric("Total Invoices", len(invoices))
+        c1.metric("Total Invoices", total_count)
         c2.metric("Total Revenue", f"₹{total_rev:,.2f}")
-        c3.metric("Paid", len(paid))
-        c4.metric("Draft", len(draft))
+        c3.metric("Paid", totals.get("paid", {}).get("count", 0))
+        c4.metric("Draft", totals.get("draft", {}).get("count", 0))
+
+        st.subheader("Top Items by Revenue")
+        if top_items:
+            st.dataframe(
+                pd.DataFrame(top_items).rename(columns={
+                    "description": "Description", "invoice_count": "Invoices",
+                    "quantity": "Quantity", "revenue": "Revenue",
+                }),
+                hide_index=True, use_container_width=True,
+                column_config={"Revenue": st.column_config.NumberColumn(format="₹%.2f")},
+            )
+
+        serial = st.text_input("🔎 Find invoices by part serial no")
+        if serial.strip():
+            matches = find_invoices_by_serial(db, serial)
+            st.caption(f"{len(matches)} invoices contain serial {serial.strip()}")
+            for inv in matches:
+                st.write(f"**{inv['invoice_number']}** | {inv.get('client_name','N/A')} | {inv.get('issue_date','')} | {inv.get('invoice_status','')}")
 
         st.subheader("Recent Invoices")
-        for inv in invoices[:20]:
+        for inv in recent:
             st.write(f"**{inv['invoice_number']}** | {inv.get('client_name','N/A')} | ₹{inv.get('grand_total',0):.2f} | {inv.get('invoice_status','')}")
     except Exception as e:
         st.error(f"Error: {e}")
\ No newline at end of file
@@ -1,7 +1,9 @@
 import streamlit as st
 import bcrypt
+from utils.db import get_profile_by_email, get_password_hash, create_signup_request
+from utils.repository import DuplicateError
 
-def show_auth(supabase):
+def show_auth(db):
     st.markdown("# 📄 Invoice Pro")
     tab1, tab2 = st.tabs(["🔐 Login", "📝 Request Access"])
 
@@ -16,8 +18,7 @@ def show_auth(supabase):
                 st.error("Please enter email and password.")
                 return
             try:
-                res = supabase.table("profiles").select("*").eq("email", email).single().execute()
-                profile = res.data
+                profile = get_profile_by_email(db, email)
             except:
                 st.error("Invalid email or password.")
                 return
@@ -28,8 +29,7 @@ def show_auth(supabase):
 
             # Verify password
             try:
-                pwd_res = supabase.table("signup_requests").select("raw_password").eq("email", email).single().execute()
-                hashed = pwd_res.data.get("raw_password","") if pwd_res.data else ""
+                hashed = get_password_hash(db, email)
             except:
                 hashed = ""
 
@@ -44,7 +44,7 @@ def show_auth(supabase):
             st.session_state.user = profile
             st.session_state.role = profile["role"]
             from utils.auth import save_session
-            save_session(profile["id"])
+            save_session(profile)
             st.rerun()
 
     with tab2:
@@ -67,14 +67,13 @@ def show_auth(supabase):
                 return
             hashed_pwd = bcrypt.hashpw(pwd.encode(), bcrypt.gensalt()).decode()
             try:
-                supabase.table("signup_requests").insert({
+                create_signup_request(db, {
                     "email": email_s, "full_name": full_name,
                     "company_name": company, "phone": phone,
-                    "raw_password": hashed_pwd, "status": "pending"
-                }).execute()
+                    "raw_password": hashed_pwd,
+                })
                 st.success("✅ Request submitted! You'll be notified once a Super Admin approves your account.")
+            except DuplicateError:
+                st.warning("A request with this email already exists.")
             except Exception as e:
-                if "duplicate" in str(e).lower():
-                    st.warning("A request with this email already exists.")
-                else:
-                    st.error(f"Error: {e}")
\ No newline at end of file
+                st.error(f"Error: {e}")
\ No newline at end of file
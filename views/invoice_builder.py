@@ -1,18 +1,30 @@
 import streamlit as st
 from datetime import datetime, timedelta
 from io import BytesIO
-import json
-from utils.db import get_user_settings, save_user_settings, save_invoice, get_next_invoice_number, increment_invoice_counter
-from utils.templates import render_invoice
+import pandas as pd
+from utils.db import get_user_settings, save_user_settings, save_invoice_with_counter, get_next_invoice_number, get_invoice_for_render
+from utils.numbering import invoice_numbers
+from utils.templates import render_invoice, render_item_row
+from utils.render_cache import render_key
+from utils.render_queue import render_queue
+from utils.batch_export import pdf_filename
+from utils.importer import import_items, import_invoices
+from utils.line_items import NUMERIC_DEFAULTS, blank_item, items_frame, frame_items, normalize_frame, parse_rows
+from utils.pricing import price_invoice
+from utils.repository import DuplicateError
+from views.pdf_download import show_pdf_download
 
-def show_invoice_builder(supabase):
+def _append_pasted_rows(grid, keys):
+    st.session_state.item_grid = pd.concat([grid, parse_rows(st.session_state.item_paste, keys)], ignore_index=True)
+    st.session_state.item_grid_version += 1
+    st.session_state.item_paste = ""
+
+def show_invoice_builder(db):
     st.title("📄 Invoice Builder")
     uid = st.session_state.user["id"]
 
-    # Load settings
-    if "user_settings" not in st.session_state:
-        st.session_state.user_settings = get_user_settings(supabase, uid)
-    s = st.session_state.user_settings
+    # Load settings (shared, cached copy)
+    s = get_user_settings(db, uid)
 
     # Item state - renamed to avoid conflict with st.session_state.items method
     if "invoice_items" not in st.session_state:
@@ -30,76 +42,145 @@ def show_invoice_builder(supabase):
         st.subheader("Invoice Details")
         issue_date = st.date_input("Issue Date", value=datetime.now().date())
         due_date = st.date_input("Due Date", value=(datetime.now() + timedelta(days=30)).date())
-        invoice_number = get_next_invoice_number(supabase, uid, s)
-        st.info(f"Invoice #: **{invoice_number}**")
+        invoice_number = get_next_invoice_number(db, uid, s)
+        st.info(f"Invoice #: **{invoice_number}** (assigned on save)")
 
     # Items table
     st.subheader("Line Items")
     enabled_cols = [c for c in s.get("custom_columns", []) if c.get("enabled")]
 
-    # Header row
-    col_widths = [0.5] + [2 if c["key"] == "description" else 1.5 for c in enabled_cols] + [0.5]
-    header = st.columns(col_widths)
-    header[0].markdown("**#**")
-    for i, col in enumerate(enabled_cols):
-        header[i + 1].markdown(f"**{col['name']}**")
-    header[-1].markdown("")
-
-    items_to_remove = []
-    for idx, item in enumerate(st.session_state.invoice_items):
-        cols = st.columns(col_widths)
-        cols[0].write(f"{idx + 1}")
-        for i, col in enumerate(enabled_cols):
-            key = col["key"]
-            if key == "quantity":
-                val = cols[i + 1].number_input(
-                    "", value=float(item.get(key, 1.0)),
-                    min_value=0.0, step=1.0,
-                    key=f"{key}_{idx}",
-                    label_visibility="collapsed"
-                )
-            elif key == "unit_price":
-                val = cols[i + 1].number_input(
-                    "", value=float(item.get(key, 0.0)),
-                    min_value=0.0, step=1.0,
-                    key=f"{key}_{idx}",
-                    label_visibility="collapsed"
-                )
+    keys = [c["key"] for c in enabled_cols]
+    with st.expander("📥 Import from CSV / Excel"):
+        upload = st.file_uploader(
+            "One row per item. Headers are matched to your columns (" + ", ".join(c["name"] for c in enabled_cols) + ").",
+            type=["csv", "xlsx"], key="item_import",
+        )
+        target = st.radio("Import into", ["This invoice", "New invoices"], horizontal=True, key="import_target",
+                          help="New invoices need an Invoice column; rows with the same value form one invoice.")
+        keep_numbers = target == "New invoices" and st.checkbox(
+            "Keep the file's invoice numbers", help="For migrating history. Otherwise new numbers are assigned."
+        )
+        if st.button("Import", disabled=upload is None):
+            bar = st.progress(0.0, text="Importing...")
+
+            def report(rows, per_second):
+                bar.progress((rows % 100_000) / 100_000, text=f"{rows:,} rows read · {per_second:,.0f} rows/sec")
+
+            try:
+                if target == "This invoice":
+                    result = import_items(upload, upload.name, enabled_cols, progress=report)
+                    st.session_state.invoice_items.extend(result["items"])
+                    st.session_state.pop("item_grid", None)
+                    done = f"Added {len(result['items']):,} items"
+                else:
+                    result = import_invoices(db, uid, upload, upload.name, s, keep_numbers=keep_numbers, progress=report)
+                    done = f"Created {result['invoices']:,} invoices"
+            except ValueError as e:
+                bar.empty()
+                st.error(str(e))
             else:
-                val = cols[i + 1].text_input(
-                    "", value=item.get(key, ""),
-                    key=f"{key}_{idx}",
-                    label_visibility="collapsed"
-                )
-            st.session_state.invoice_items[idx][key] = val
-
-        if cols[-1].button("✕", key=f"rm_{idx}"):
-            items_to_remove.append(idx)
-
-    for idx in sorted(items_to_remove, reverse=True):
-        st.session_state.invoice_items.pop(idx)
-    if items_to_remove:
-        st.rerun()
-
-    if st.button("➕ Add Item"):
-        new_item = {
-            c["key"]: (1.0 if c["key"] == "quantity" else (0.0 if c["key"] == "unit_price" else ""))
+                bar.progress(1.0, text="Done")
+                st.success(f"{done} from {result['rows']:,} rows in {result['seconds']:.1f}s "
+                           f"({result['per_second']:,.0f} rows/sec)")
+                if result["error_count"]:
+                    st.warning(f"{result['error_count']:,} rows skipped")
+                    st.dataframe(
+                        pd.DataFrame(result["errors"], columns=["Line", "Problem"]),
+                        hide_index=True, use_container_width=True,
+                    )
+
+    mode = st.radio("Editor", ["Rows", "Grid"], horizontal=True, key="item_editor_mode",
+                    help="Grid edits many items at once and accepts rows pasted from a spreadsheet.")
+
+    if mode == "Grid":
+        # The grid edits a columnar copy of the items. Its base frame stays fixed
+        # between reruns so the editor only applies the changed cells; it is rebuilt
+        # (under a new widget key) when rows are pasted in or the items are reset.
+        base = st.session_state.get("item_grid")
+        if base is None or list(base.columns) != keys:
+            base = items_frame(st.session_state.invoice_items, keys)
+            st.session_state.item_grid = base
+            st.session_state.item_grid_version = st.session_state.get("item_grid_version", 0) + 1
+        column_config = {
+            c["key"]: (st.column_config.NumberColumn(c["name"], min_value=0.0, step=1.0,
+                                                     format="₹%.2f" if c["key"] == "unit_price" else "%g")
+                       if c["key"] in NUMERIC_DEFAULTS else st.column_config.TextColumn(c["name"]))
             for c in enabled_cols
         }
-        st.session_state.invoice_items.append(new_item)
-        st.rerun()
-
-    # Totals
-    subtotal = sum(
-        float(i.get("quantity", 0)) * float(i.get("unit_price", 0))
-        for i in st.session_state.invoice_items
-    )
+        edited = st.data_editor(
+            base, key=f"item_grid_{st.session_state.item_grid_version}", num_rows="dynamic",
+            hide_index=True, use_container_width=True, column_config=column_config,
+        )
+        grid = normalize_frame(edited, keys)
+        st.session_state.invoice_items = frame_items(grid)
+
+        with st.expander("📋 Paste rows"):
+            pasted = st.text_area(
+                "Rows copied from a spreadsheet or CSV, columns in table order: "
+                + ", ".join(c["name"] for c in enabled_cols),
+                key="item_paste", height=120,
+            )
+            st.button("Append rows", disabled=not pasted.strip(), on_click=_append_pasted_rows, args=(grid, keys))
+    else:
+        # Leaving the grid: it is rebuilt from the items next time it is shown
+        st.session_state.pop("item_grid", None)
+
+        # Header row
+        col_widths = [0.5] + [2 if c["key"] == "description" else 1.5 for c in enabled_cols] + [0.5]
+        header = st.columns(col_widths)
+        header[0].markdown("**#**")
+        for i, col in enumerate(enabled_cols):
+            header[i + 1].markdown(f"**{col['name']}**")
+        header[-1].markdown("")
+
+        items_to_remove = []
+        for idx, item in enumerate(st.session_state.invoice_items):
+            cols = st.columns(col_widths)
+            cols[0].write(f"{idx + 1}")
+            for i, col in enumerate(enabled_cols):
+                key = col["key"]
+                if key == "quantity":
+                    val = cols[i + 1].number_input(
+                        "", value=float(item.get(key, 1.0)),
+                        min_value=0.0, step=1.0,
+                        key=f"{key}_{idx}",
+                        label_visibility="collapsed"
+                    )
+                elif key == "unit_price":
+                    val = cols[i + 1].number_input(
+                        "", value=float(item.get(key, 0.0)),
+                        min_value=0.0, step=1.0,
+                        key=f"{key}_{idx}",
+                        label_visibility="collapsed"
+                    )
+                else:
+                    val = cols[i + 1].text_input(
+                        "", value=item.get(key, ""),
+                        key=f"{key}_{idx}",
+                        label_visibility="collapsed"
+                    )
+                st.session_state.invoice_items[idx][key] = val
+
+            if cols[-1].button("✕", key=f"rm_{idx}"):
+                items_to_remove.append(idx)
+
+        for idx in sorted(items_to_remove, reverse=True):
+            st.session_state.invoice_items.pop(idx)
+        if items_to_remove:
+            st.rerun()
+
+        if st.button("➕ Add Item"):
+            st.session_state.invoice_items.append(blank_item(keys))
+            st.rerun()
+
+    # Totals, computed once here; the preview and the saved invoice reuse them
     gst_on = s.get("gst_enabled", False)
     cgst_pct = float(s.get("cgst_percent", 9.0))
     sgst_pct = float(s.get("sgst_percent", 9.0))
-    cgst_amt = (subtotal * cgst_pct / 100) if gst_on else 0
-    sgst_amt = (subtotal * sgst_pct / 100) if gst_on else 0
-    grand_total = subtotal + cgst_amt + sgst_amt
+    priced = price_invoice(st.session_state.invoice_items, gst_on, cgst_pct, sgst_pct)
+    items = priced["items"]
+    subtotal, cgst_amt = priced["subtotal"], priced["cgst_amount"]
+    sgst_amt, grand_total = priced["sgst_amount"], priced["grand_total"]
 
     col1, col2 = st.columns([2, 1])
     with col2:
@@ -109,17 +190,15 @@ def show_invoice_builder(supabase):
             st.metric(f"SGST ({sgst_pct}%)", f"₹{sgst_amt:.2f}")
         st.metric("Grand Total", f"₹{grand_total:.2f}")
 
-    # Build invoice data
+    # Build invoice data (only the fields the preview renders)
     invoice_data = {
         **s,
         "invoice_number": invoice_number,
         "client_name": client_name,
         "client_address": client_address,
-        "client_email": client_email,
-        "client_phone": client_phone,
         "issue_date": str(issue_date),
         "due_date": str(due_date),
-        "items": st.session_state.invoice_items,
+        "items": items,
         "subtotal": subtotal,
         "cgst_amount": cgst_amt,
         "sgst_amount": sgst_amt,
@@ -131,7 +210,29 @@ def show_invoice_builder(supabase):
     # Preview
     st.subheader("📋 Preview")
     template_name = s.get("invoice_template", "classic")
-    html = render_invoice(template_name, invoice_data)
+
+    # Re-render only the rows whose content (or position) changed since the last rerun
+    cols_sig = tuple((c["key"], c["name"]) for c in enabled_cols)
+    row_cache = st.session_state.get("preview_rows", {})
+    fresh_rows, row_html = {}, []
+    for idx, item in enumerate(items):
+        rk = (template_name, cols_sig, idx, tuple(sorted(item.items())))
+        fragment = row_cache.get(rk)
+        if fragment is None:
+            fragment = render_item_row(template_name, idx, item, enabled_cols)
+        fresh_rows[rk] = fragment
+        row_html.append(fragment)
+    st.session_state.preview_rows = fresh_rows
+    rows = "".join(row_html)
+
+    # Reassemble the document only when something it shows has changed
+    doc_key = render_key({**invoice_data, "items": rows}, template_name, "preview")
+    cached = st.session_state.get("preview_html")
+    if cached and cached[0] == doc_key:
+        html = cached[1]
+    else:
+        html = render_invoice(template_name, invoice_data, rows)
+        st.session_state.preview_html = (doc_key, html)
     st.components.v1.html(html, height=1100, scrolling=True)
 
     # Actions
@@ -139,16 +240,17 @@ def show_invoice_builder(supabase):
     c1, c2, c3 = st.columns(3)
     with c1:
         if st.button("💾 Save Invoice", type="primary", use_container_width=True):
+            # The number is only assigned now, so two tabs can never save the same one
+            counter = invoice_numbers.take(db, uid)
             record = {
                 "user_id": uid,
-                "invoice_number": invoice_number,
                 "client_name": client_name,
                 "client_address": client_address,
                 "client_email": client_email,
                 "client_phone": client_phone,
                 "issue_date": str(issue_date),
                 "due_date": str(due_date),
-                "items": json.dumps(st.session_state.invoice_items),
+                "items": items,
                 "subtotal": subtotal,
                 "cgst_amount": cgst_amt,
                 "sgst_amount": sgst_amt,
@@ -160,11 +262,24 @@ def show_invoice_builder(supabase):
                 "template": template_name,
                 "invoice_status": "draft",
             }
-            save_invoice(supabase, record)
-            increment_invoice_counter(supabase, uid, int(s.get("invoice_counter", 1)))
-            st.session_state.user_settings = get_user_settings(supabase, uid)
-            st.success(f"✅ Invoice {invoice_number} saved!")
+            try:
+                saved = save_invoice_with_counter(db, record, counter)
+            except Exception as e:
+                # A number that clashed is taken for good; never hand it out again
+                if counter is not None and not isinstance(e, DuplicateError):
+                    invoice_numbers.release(uid, counter)
+                st.error(f"Error saving invoice: {e}")
+                st.stop()
+            st.success(f"✅ Invoice {saved['invoice_number']} saved!")
+            # Render the saved invoice's PDF in the background for the download in c3
+            inv_data = get_invoice_for_render(db, saved["invoice_id"], uid)
+            st.session_state.saved_pdf = {
+                "invoice_number": saved["invoice_number"],
+                "job": render_queue.submit(inv_data),
+                "file_name": pdf_filename(inv_data),
+            }
             st.session_state.invoice_items = []
+            st.session_state.pop("item_grid", None)
             st.rerun()
 
     with c2:
@@ -237,4 +352,10 @@ def show_invoice_builder(supabase):
             margin-top: 4px;
         ">🖨️ Print / Save as PDF</button>
         """
-        st.components.v1.html(print_js, height=50)
\ No newline at end of file
+        st.components.v1.html(print_js, height=50)
+
+    with c3:
+        saved_pdf = st.session_state.get("saved_pdf")
+        if saved_pdf:
+            st.caption(f"Last saved: {saved_pdf['invoice_number']}")
+            show_pdf_download(saved_pdf["job"], saved_pdf["file_name"], "saved_pdf")
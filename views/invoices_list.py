@@ -1,133 +1,289 @@
 import streamlit as st
-import json
-from utils.db import get_user_invoices, get_all_invoices, get_user_settings
-from utils.templates import render_invoice
-from utils.pdf_generator import generate_pdf
+import os
+import tempfile
+import time
+import pandas as pd
+from datetime import date
+from utils.db import get_invoices_page, get_invoice_for_render, iter_invoices_for_export, update_invoice_status, search_invoices_page
+from utils.render_cache import cached_render_invoice
+from utils.render_queue import render_queue
+from utils.batch_export import export_pdfs_zip, pdf_filename
+from utils.concurrency import gather
+from views.pdf_download import show_pdf_download
 
-def show_invoices(supabase):
+# Export ZIPs live in the temp dir until replaced or cleared; ones abandoned by
+# ended sessions are swept when any new export starts
+EXPORT_PREFIX = "invoicepro-export-"
+EXPORT_MAX_AGE = 24 * 3600
+
+def _read_export(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+def _discard_export():
+    """Delete this session's export ZIP and any abandoned ones older than EXPORT_MAX_AGE."""
+    export = st.session_state.pop("export_zip", None)
+    stale = [export["path"]] if export else []
+    cutoff = time.time() - EXPORT_MAX_AGE
+    with os.scandir(tempfile.gettempdir()) as entries:
+        for e in entries:
+            try:
+                if e.name.startswith(EXPORT_PREFIX) and e.stat().st_mtime < cutoff:
+                    stale.append(e.path)
+            except OSError:
+                pass
+    for path in stale:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def show_invoices(db):
     st.title("🗂️ Invoices")
     uid = st.session_state.user["id"]
     role = st.session_state.role
+    is_admin = role in ("superadmin", "admin")
 
-    if role in ("superadmin", "admin"):
-        invoices = get_all_invoices(supabase)
+    # Search / filter
+    search = st.text_input("🔍 Search by client or invoice number")
+    col1, col2 = st.columns(2)
+    with col1:
+        status_filter = st.selectbox("Status", ["All", "draft", "sent", "paid"])
+    with col2:
+        page_size = st.selectbox("Per page", [25, 100, 500, 1000], index=1)
+
+    # Cursors of the pages visited so far (keyset cursors when browsing, offsets
+    # into the ranked matches when searching); reset whenever the filters change.
+    # inv_page numbers each distinct page shown, so the table's selection (row
+    # positions) never carries over to a different set of rows.
+    filters = (search, status_filter, page_size)
+    if st.session_state.get("inv_filters") != filters:
+        st.session_state.inv_filters = filters
+        st.session_state.inv_cursors = [None]
+        st.session_state.inv_page = st.session_state.get("inv_page", 0) + 1
+    cursors = st.session_state.inv_cursors
+
+    status = None if status_filter == "All" else status_filter
+    if search.strip():
+        # Ranked index search, best matches first
+        filtered, next_cursor = search_invoices_page(
+            db, search, user_id=None if is_admin else uid, status=status,
+            offset=cursors[-1] or 0, page_size=page_size, with_owner=is_admin,
+        )
     else:
-        invoices = get_user_invoices(supabase, uid)
+        filtered, next_cursor = get_invoices_page(
+            db,
+            user_id=None if is_admin else uid,
+            status=status,
+            cursor=cursors[-1],
+            page_size=page_size,
+            with_owner=is_admin,
+        )
 
-    if not invoices:
+    if not filtered:
         st.info("No invoices found.")
         return
 
-    # Search / filter
-    search = st.text_input("🔍 Search by client or invoice number")
-    status_filter = st.selectbox("Status", ["All", "draft", "sent", "paid"])
+    noun = "matches" if search.strip() else "invoices"
+    st.markdown(f"Page **{len(cursors)}** · **{len(filtered)}** {noun}")
+    c1, c2, _ = st.columns([1, 1, 4])
+    with c1:
+        if st.button("◀ Previous", disabled=len(cursors) == 1, use_container_width=True):
+            cursors.pop()
+            st.session_state.inv_page += 1
+            st.rerun()
+    with c2:
+        if st.button("Next ▶", disabled=next_cursor is None, use_container_width=True):
+            cursors.append(next_cursor)
+            st.session_state.inv_page += 1
+            st.rerun()
 
-    filtered = invoices
-    if search:
-        filtered = [i for i in filtered if search.lower() in i.get("client_name", "").lower()
-                    or search.lower() in i.get("invoice_number", "").lower()]
-    if status_filter != "All":
-        filtered = [i for i in filtered if i.get("invoice_status", "") == status_filter]
+    # One virtualized table for the whole page; the widgets below are the same
+    # handful however many invoices are listed
+    table = pd.DataFrame([{
+        "Invoice #": inv["invoice_number"],
+        "Client": inv.get("client_name") or "N/A",
+        **({"Owner": (inv.get("profiles") or {}).get("full_name", "")} if is_admin else {}),
+        "Issue Date": inv.get("issue_date"),
+        "Due Date": inv.get("due_date"),
+        "Grand Total": float(inv.get("grand_total") or 0),
+        "Status": (inv.get("invoice_status") or "draft").upper(),
+        "Template": inv.get("template", "classic"),
+    } for inv in filtered])
+    event = st.dataframe(
+        table, key=f"inv_table_{st.session_state.inv_page}", on_select="rerun", selection_mode="multi-row",
+        hide_index=True, use_container_width=True,
+        column_config={"Grand Total": st.column_config.NumberColumn(format="₹%.2f")},
+    )
+    selected = [filtered[i] for i in event.selection.rows if i < len(filtered)]
 
-    st.markdown(f"**{len(filtered)}** invoices found")
+    with st.expander("📦 Batch PDF export"):
+        mode = st.radio("Export", ["Selected invoices", "Date range"], horizontal=True)
+        ids, issued_from, issued_to = None, None, None
+        if mode == "Selected invoices":
+            ids = [inv["id"] for inv in selected]
+            st.caption(f"{len(ids)} invoices selected in the table above.")
+        else:
+            d1, d2 = st.columns(2)
+            with d1:
+                issued_from = str(st.date_input("Issued from", value=date.today().replace(day=1), key="exp_from"))
+            with d2:
+                issued_to = str(st.date_input("Issued to", value=date.today(), key="exp_to"))
+
+        if st.button("Export ZIP", disabled=mode == "Selected invoices" and not ids):
+            _discard_export()
+            expected = len(ids) if ids else None
+            # A date range has no total up front, so it gets a running count instead of a bar
+            bar = st.progress(0.0, text="Rendering PDFs...") if expected else st.empty()
+
+            def report(done, per_second):
+                text = f"{done} PDFs rendered · {per_second:.1f} invoices/sec"
+                if expected:
+                    bar.progress(min(done / expected, 1.0), text=text)
+                else:
+                    bar.caption(f"⏳ {text}")
+
+            # Stream to a temp file that stays on disk until it is replaced or cleared;
+            # reruns only keep its path, and it is read when the download is clicked
+            out = tempfile.NamedTemporaryFile(prefix=EXPORT_PREFIX, suffix=".zip", delete=False)
+            try:
+                with out:
+                    result = export_pdfs_zip(
+                        iter_invoices_for_export(
+                            db, user_id=None if is_admin else uid,
+                            ids=ids, issued_from=issued_from, issued_to=issued_to,
+                        ),
+                        out, progress=report,
+                    )
+            except BaseException:
+                os.remove(out.name)
+                raise
+            bar.empty()
+            st.session_state.export_zip = {"path": out.name, **result}
+
+        export = st.session_state.get("export_zip")
+        if export:
+            st.success(f"Exported {export['count']} invoices in {export['seconds']:.1f}s "
+                       f"({export['per_second']:.1f} invoices/sec)")
+            d1, d2 = st.columns(2)
+            with d1:
+                st.download_button("⬇️ Download ZIP", lambda: _read_export(export["path"]), file_name="invoices.zip",
+                                   mime="application/zip", on_click="ignore", use_container_width=True)
+            with d2:
+                st.button("🗑️ Clear export", on_click=_discard_export, use_container_width=True)
     st.divider()
 
-    for inv in filtered:
-        with st.expander(f"#{inv['invoice_number']} — {inv.get('client_name','N/A')} — ₹{inv.get('grand_total',0):.2f} — {inv.get('invoice_status','draft').upper()}"):
-            col1, col2, col3 = st.columns([2, 2, 1])
-            with col1:
-                st.write(f"**Client:** {inv.get('client_name')}")
-                st.write(f"**Issue Date:** {inv.get('issue_date')}")
-                st.write(f"**Due Date:** {inv.get('due_date')}")
-            with col2:
-                st.write(f"**Subtotal:** ₹{inv.get('subtotal', 0):.2f}")
-                st.write(f"**Grand Total:** ₹{inv.get('grand_total', 0):.2f}")
-                st.write(f"**Template:** {inv.get('template', 'classic')}")
-            with col3:
-                new_status = st.selectbox(
-                    "Status", ["draft", "sent", "paid"],
-                    index=["draft", "sent", "paid"].index(inv.get("invoice_status", "draft")),
-                    key=f"st_{inv['id']}"
-                )
-                if st.button("Update", key=f"upd_{inv['id']}"):
-                    supabase.table("invoices").update({"invoice_status": new_status}).eq("id", inv["id"]).execute()
-                    st.rerun()
-
-            if st.button("📄 View & Download PDF", key=f"pdf_{inv['id']}"):
-                items = inv.get("items", [])
-                if isinstance(items, str):
-                    items = json.loads(items)
-                settings = get_user_settings(supabase, inv["user_id"])
-                inv_data = {**settings, **inv, "items": items}
-                html = render_invoice(inv.get("template", "classic"), inv_data)
-                st.components.v1.html(html, height=800, scrolling=True)
-
-                print_js = f"""
-                <script>
-                function printInvoice() {{
-                    var win = window.open('', '_blank', 'width=900,height=700');
-                    win.document.write(`
-                        <!DOCTYPE html>
-                        <html>
-                        <head>
-                        <meta charset="utf-8">
-                        <style>
-                            @page {{
-                                size: A4;
-                                margin: 0;
-                            }}
-                            @media print {{
-                                * {{
-                                    -webkit-print-color-adjust: exact !important;
-                                    print-color-adjust: exact !important;
-                                    color-adjust: exact !important;
-                                }}
-                                html, body {{
-                                    width: 210mm;
-                                    margin: 0 !important;
-                                    padding: 0 !important;
-                                }}
-                                .invoice-wrapper {{
-                                    width: 100% !important;
-                                    max-width: 100% !important;
-                                    margin: 0 !important;
-                                    border: none !important;
-                                    box-shadow: none !important;
-                                    border-radius: 0 !important;
-                                }}
-                            }}
-                            @media screen {{
-                                body {{
-                                    background: #f0f0f0;
-                                    display: flex;
-                                    justify-content: center;
-                                    padding: 20px;
-                                }}
-                            }}
-                        </style>
-                        </head>
-                        <body>
-                        {html}
-                        </body>
-                        </html>
-                    `);
-                    win.document.close();
-                    win.focus();
-                    setTimeout(function() {{
-                        win.print();
-                    }}, 800);
-                }}
-                </script>
-                <button onclick="printInvoice()" style="
-                    background-color: #1a1a2e;
-                    color: white;
-                    border: none;
-                    padding: 10px 20px;
-                    border-radius: 6px;
-                    cursor: pointer;
-                    font-size: 15px;
-                    width: 100%;
-                    margin-top: 4px;
-                ">🖨️ Print / Save as PDF</button>
-                """
-                st.components.v1.html(print_js, height=55)
\ No newline at end of file
+    # ── DETAIL PANEL ──
+    if not selected:
+        st.caption("Select invoices in the table to update their status or view a PDF.")
+        return
+
+    inv = selected[0]
+    st.subheader(f"#{inv['invoice_number']} — {inv.get('client_name','N/A')}")
+    col1, col2, col3 = st.columns([2, 2, 1])
+    with col1:
+        st.write(f"**Client:** {inv.get('client_name')}")
+        st.write(f"**Issue Date:** {inv.get('issue_date')}")
+        st.write(f"**Due Date:** {inv.get('due_date')}")
+    with col2:
+        st.write(f"**Subtotal:** ₹{inv.get('subtotal', 0):.2f}")
+        st.write(f"**Grand Total:** ₹{inv.get('grand_total', 0):.2f}")
+        st.write(f"**Template:** {inv.get('template', 'classic')}")
+    with col3:
+        new_status = st.selectbox(
+            "Status", ["draft", "sent", "paid"],
+            index=["draft", "sent", "paid"].index(inv.get("invoice_status", "draft")),
+            key=f"st_{inv['id']}"
+        )
+        label = "Update" if len(selected) == 1 else f"Update {len(selected)} selected"
+        if st.button(label, key="upd_selected"):
+            gather(*[lambda i=i: update_invoice_status(db, i["id"], new_status) for i in selected])
+            st.rerun()
+
+    if len(selected) > 1:
+        st.caption(f"Showing the first of {len(selected)} selected invoices.")
+
+    if st.button("📄 View & Download PDF", key=f"pdf_{inv['id']}"):
+        inv_data = get_invoice_for_render(db, inv["id"], inv["user_id"])
+        # The PDF renders in the background; the preview shows meanwhile
+        st.session_state.pdf_view = {
+            "invoice_id": inv["id"],
+            "html": cached_render_invoice(inv.get("template", "classic"), inv_data),
+            "job": render_queue.submit(inv_data),
+            "file_name": pdf_filename(inv_data),
+        }
+    view = st.session_state.get("pdf_view")
+    if view and view["invoice_id"] == inv["id"]:
+        html = view["html"]
+        st.components.v1.html(html, height=800, scrolling=True)
+        show_pdf_download(view["job"], view["file_name"], inv["id"])
+
+        print_js = f"""
+        <script>
+        function printInvoice() {{
+            var win = window.open('', '_blank', 'width=900,height=700');
+            win.document.write(`
+                <!DOCTYPE html>
+                <html>
+                <head>
+                <meta charset="utf-8">
+                <style>
+                    @page {{
+                        size: A4;
+                        margin: 0;
+                    }}
+                    @media print {{
+                        * {{
+                            -webkit-print-color-adjust: exact !important;
+                            print-color-adjust: exact !important;
+                            color-adjust: exact !important;
+                        }}
+                        html, body {{
+                            width: 210mm;
+                            margin: 0 !important;
+                            padding: 0 !important;
+                        }}
+                        .invoice-wrapper {{
+                            width: 100% !important;
+                            max-width: 100% !important;
+                            margin: 0 !important;
+                            border: none !important;
+                            box-shadow: none !important;
+                            border-radius: 0 !important;
+                        }}
+                    }}
+                    @media screen {{
+                        body {{
+                            background: #f0f0f0;
+                            display: flex;
+                            justify-content: center;
+                            padding: 20px;
+                        }}
+                    }}
+                </style>
+                </head>
+                <body>
+                {html}
+                </body>
+                </html>
+            `);
+            win.document.close();
+            win.focus();
+            setTimeout(function() {{
+                win.print();
+            }}, 800);
+        }}
+        </script>
+        <button onclick="printInvoice()" style="
+            background-color: #1a1a2e;
+            color: white;
+            border: none;
+            padding: 10px 20px;
+            border-radius: 6px;
+            cursor: pointer;
+            font-size: 15px;
+            width: 100%;
+            margin-top: 4px;
+        ">🖨️ Print / Save as PDF</button>
+        """
+        st.components.v1.html(print_js, height=55)
\ No newline at end of file
@@ -0,0 +1,29 @@
+import streamlit as st
+from utils.render_queue import render_queue, RUNNING, DONE, FAILED
+
+# Seconds between status checks while a PDF is rendering
+PDF_POLL_SECONDS = 1.0
+
+def show_pdf_download(job_id: str, file_name: str, key: str):
+    """Download button for a queued PDF render; polls the job until it finishes."""
+    status = render_queue.status(job_id)
+    if status["status"] == DONE:
+        pdf = render_queue.result(job_id)
+        if pdf is not None:
+            st.download_button("⬇️ Download PDF", pdf, file_name=file_name,
+                               mime="application/pdf", key=f"dl_{key}")
+            return
+        status = {"status": FAILED, "error": "The rendered PDF is no longer available"}
+    if status["status"] == FAILED:
+        st.error(f"PDF failed: {status['error']}")
+        return
+
+    # Only this fragment reruns while waiting; the page reruns once, when the job is done
+    @st.fragment(run_every=PDF_POLL_SECONDS)
+    def poll():
+        current = render_queue.status(job_id)["status"]
+        if current in (DONE, FAILED):
+            st.rerun()
+        st.caption("⏳ Rendering PDF…" if current == RUNNING else "⏳ PDF queued…")
+
+    poll()
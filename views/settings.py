@@ -1,12 +1,13 @@
 import streamlit as st
-import base64
+import copy
 import json
 from utils.db import get_user_settings, save_user_settings
+from utils.assets import store_logo, logo_data_uri
 
-def show_settings(supabase):
+def show_settings(db):
     st.title("⚙️ Settings")
     uid = st.session_state.user["id"]
-    s = get_user_settings(supabase, uid)
+    s = copy.deepcopy(dict(get_user_settings(db, uid)))
 
     st.subheader("🏢 Company / Header")
     col1, col2 = st.columns(2)
@@ -17,9 +18,13 @@ def show_settings(supabase):
     with col2:
         uploaded = st.file_uploader("Company Logo", type=["png","jpg","jpeg"])
         if uploaded:
-            s["company_logo_base64"] = base64.b64encode(uploaded.read()).decode()
-        if s.get("company_logo_base64"):
-            st.image(f"data:image/png;base64,{s['company_logo_base64']}", width=150)
+            try:
+                s["logo_hash"] = store_logo(db, uploaded.getvalue())
+            except ValueError as e:
+                st.error(str(e))
+        logo_uri = logo_data_uri(s.get("logo_hash"))
+        if logo_uri:
+            st.image(logo_uri, width=150)
 
     st.subheader("📞 Footer / Contact")
     col1, col2, col3 = st.columns(3)
@@ -65,6 +70,5 @@ def show_settings(supabase):
             st.rerun()
 
     if st.button("💾 Save All Settings", type="primary", use_container_width=True):
-        save_user_settings(supabase, uid, s)
-        st.success("✅ Settings saved permanently!")
-        st.session_state["user_settings"] = s
\ No newline at end of file
+        save_user_settings(db, uid, s)
+        st.success("✅ Settings saved permanently!")
\ No newline at end of file
@@ -1,17 +1,26 @@
 import streamlit as st
 from datetime import date, timedelta
+from utils.db import (get_platform_stats, list_signup_requests, approve_signup_request,
+                      reject_signup_request, list_profiles, update_profile)
+from utils.auth import invalidate_access, revoke_session
+from utils.concurrency import gather
 
-def show_super_admin(supabase):
+def show_super_admin(db):
     st.title("🔐 Super Admin Panel")
 
     tab1, tab2, tab3 = st.tabs(["📋 Signup Requests", "👥 All Users", "📊 Stats"])
 
+    # Every tab renders on each run, so load all three at once
+    requests, profiles, stats = gather(
+        lambda: list_signup_requests(db),
+        lambda: list_profiles(db),
+        lambda: get_platform_stats(db),
+        return_exceptions=True,
+    )
+
     with tab1:
         st.subheader("Pending Signup Requests")
-        try:
-            res = supabase.table("signup_requests").select("*").order("created_at", desc=True).execute()
-            requests = res.data or []
-        except:
+        if isinstance(requests, Exception):
             requests = []
 
         pending = [r for r in requests if r["status"] == "pending"]
@@ -25,42 +34,18 @@ def show_super_admin(supabase):
                     col1, col2, col3 = st.columns(3)
                     with col1:
                         if st.button("✅ Approve", key=f"app_{req['id']}"):
-                            # Create profile
-                            supabase.table("profiles").insert({
-                                "email": req["email"],
-                                "full_name": req["full_name"],
-                                "company_name": req.get("company_name",""),
-                                "phone": req.get("phone",""),
-                                "role": "user",
-                                "status": "approved",
-                                "access_type": "permanent",
-                            }).execute()
-                            # Get the new profile id
-                            p = supabase.table("profiles").select("id").eq("email", req["email"]).single().execute().data
-                            # Create default settings
-                            supabase.table("user_settings").insert({"user_id": p["id"]}).execute()
-                            # Mark request approved
-                            supabase.table("signup_requests").update({
-                                "status": "approved",
-                                "reviewed_by": st.session_state.user["id"],
-                                "reviewed_at": str(date.today())
-                            }).eq("id", req["id"]).execute()
+                            profile = approve_signup_request(db, req, st.session_state.user["id"])
+                            invalidate_access(profile["id"])
                             st.success("User approved!")
                             st.rerun()
                     with col2:
                         if st.button("❌ Reject", key=f"rej_{req['id']}"):
-                            supabase.table("signup_requests").update({
-                                "status": "rejected",
-                                "reviewed_by": st.session_state.user["id"],
-                                "reviewed_at": str(date.today())
-                            }).eq("id", req["id"]).execute()
+                            reject_signup_request(db, req["id"], st.session_state.user["id"])
                             st.rerun()
 
     with tab2:
         st.subheader("Manage All Users")
-        try:
-            profiles = supabase.table("profiles").select("*").order("created_at", desc=True).execute().data or []
-        except:
+        if isinstance(profiles, Exception):
             profiles = []
 
         for p in profiles:
@@ -88,19 +73,18 @@ def show_super_admin(supabase):
                         update["access_months"] = months
                         update["access_start_date"] = str(date.today())
                         update["access_end_date"] = str(date.today() + timedelta(days=30*months))
-                    supabase.table("profiles").update(update).eq("id", p["id"]).execute()
+                    update_profile(db, p["id"], update)
+                    invalidate_access(p["id"])
+                    revoke_session(p["id"])
                     st.success("Updated!")
                     st.rerun()
 
     with tab3:
         st.subheader("Platform Statistics")
-        try:
-            total_users = len(supabase.table("profiles").select("id").execute().data or [])
-            total_invoices = len(supabase.table("invoices").select("id").execute().data or [])
-            pending_req = len(supabase.table("signup_requests").select("id").eq("status","pending").execute().data or [])
+        if isinstance(stats, Exception):
+            st.error("Could not load stats.")
+        else:
             col1, col2, col3 = st.columns(3)
-            col1.metric("Total Users", total_users)
-            col2.metric("Total Invoices", total_invoices)
-            col3.metric("Pending Requests", pending_req)
-        except:
-            st.error("Could not load stats.")
\ No newline at end of file
+            col1.metric("Total Users", stats["total_users"])
+            col2.metric("Total Invoices", stats["total_invoices"])
+            col3.metric("Pending Requests", stats["pending_requests"])
\ No newline at end of file
@@ -1,9 +1,10 @@
 import streamlit as st
+from utils.db import list_profiles
 
-def show_user_management(supabase):
+def show_user_management(db):
     st.title("👥 User Management")
     try:
-        profiles = supabase.table("profiles").select("*").execute().data or []
+        profiles = list_profiles(db)
         for p in profiles:
             with st.expander(f"{p['full_name']} ({p['email']}) — {p['status']}"):
                 st.write(f"Role: {p['role']}, Access: {p.get('access_type','permanent')}")